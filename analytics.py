@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+from types import MappingProxyType
+
+from pd import (Playsheet, list_playsheets, OFFENSE_PLAYS, DEFENSE_PLAYS,
+                CHART_ROLLS, DEFENSE_ROLLS)
+from dice import OFFENSE_DICE, DEFENSE_DICE
+
+
+class NetYards:
+    """
+    Exact distribution of net yards for one offense play against one
+    defensive formation
+
+    Net yards is the offense chart result plus the defense chart result,
+    so the distribution is the convolution of the two rows weighted by
+    the chance of each dice roll.
+
+    Attributes:
+        low:        Smallest possible net yards
+        pmf:        pmf[i] is the probability of gaining low + i yards
+        mean:       Expected net yards
+        variance:   Variance of net yards
+        first_down: Probability of gaining 10 or more yards
+    """
+
+    def __init__(self, offense_row, defense_row, offense_weights=None, defense_weights=None):
+        offense_weights = offense_weights or [1 / len(offense_row)] * len(offense_row)
+        defense_weights = defense_weights or [1 / len(defense_row)] * len(defense_row)
+
+        self.low = min(offense_row) + min(defense_row)
+        pmf = [0.0] * (max(offense_row) + max(defense_row) - self.low + 1)
+        for offense_yards, offense_p in zip(offense_row, offense_weights):
+            for defense_yards, defense_p in zip(defense_row, defense_weights):
+                pmf[offense_yards + defense_yards - self.low] += offense_p * defense_p
+        self.pmf = tuple(pmf)
+
+        self.mean = sum((self.low + i) * p for i, p in enumerate(pmf))
+        self.variance = sum((self.low + i - self.mean) ** 2 * p for i, p in enumerate(pmf))
+
+        #at_least[i] is the probability of gaining low + i yards or more
+        at_least = list(itertools.accumulate(reversed(pmf)))
+        at_least.reverse()
+        self.at_least = tuple(at_least)
+        self.first_down = self.probability_at_least(10)
+
+    def probability(self, yards):
+        index = yards - self.low
+        return self.pmf[index] if 0 <= index < len(self.pmf) else 0.0
+
+    def probability_at_least(self, yards):
+        index = yards - self.low
+        if index <= 0:
+            return 1.0
+        return self.at_least[index] if index < len(self.at_least) else 0.0
+
+
+class Matchup:
+    """
+    NetYards for every OFFENSE_PLAYS x DEFENSE_PLAYS cell when offense_sheet
+    has the ball against defense_sheet
+
+    Attributes:
+        cells:          cells[play][formation] is the NetYards of that call
+        offense_plays:  Playsheet panel rows, expected yards of each play
+                        against a random formation, a tuple of read only mappings
+        defense_plays:  Playsheet panel rows, expected yards allowed by each
+                        formation against a random play, the same
+    """
+
+    def __init__(self, offense_sheet, defense_sheet):
+        rolls = len(CHART_ROLLS)
+        self.cells = {}
+        for play_id, play in enumerate(OFFENSE_PLAYS):
+            offense_row = offense_sheet.chart[play_id * rolls:(play_id + 1) * rolls].tolist()
+            self.cells[play] = {}
+            for formation_id, formation in enumerate(DEFENSE_PLAYS):
+                row = (formation_id * len(OFFENSE_PLAYS) + play_id) * len(DEFENSE_ROLLS)
+                defense_row = defense_sheet.defense_chart[row:row + len(DEFENSE_ROLLS)].tolist()
+                self.cells[play][formation] = NetYards(offense_row, defense_row,
+                                                        OFFENSE_DICE.probabilities, DEFENSE_DICE.probabilities)
+
+        #Read only rows, every GameSnapshot of the matchup shares them
+        offense_plays = []
+        for play in OFFENSE_PLAYS:
+            cells = self.cells[play].values()
+            offense_plays.append(MappingProxyType({
+                'name': play,
+                'expected_yards': round(sum(cell.mean for cell in cells) / len(cells)),
+                'first_down': sum(cell.first_down for cell in cells) / len(cells),
+            }))
+        self.offense_plays = tuple(offense_plays)
+
+        defense_plays = []
+        for formation in DEFENSE_PLAYS:
+            cells = [self.cells[play][formation] for play in OFFENSE_PLAYS]
+            defense_plays.append(MappingProxyType({
+                'name': formation,
+                'expected_yards': round(sum(cell.mean for cell in cells) / len(cells)),
+                'first_down': sum(cell.first_down for cell in cells) / len(cells),
+            }))
+        self.defense_plays = tuple(defense_plays)
+
+    def net_yards(self, play, formation):
+        return self.cells[play][formation]
+
+
+_matchups = {}
+
+def matchup(offense_sheet, defense_sheet):
+    """
+    Cached Matchup, computed once per pair of playsheet contents
+    """
+    key = (offense_sheet.content_hash, defense_sheet.content_hash)
+    table = _matchups.get(key)
+    if table is None:
+        table = _matchups[key] = Matchup(offense_sheet, defense_sheet)
+    return table
+
+
+def precompute(teams=None):
+    """
+    Fill the cache for every ordered pair of teams, returns {(offense, defense): Matchup}
+    """
+    if teams is None:
+        teams = list_playsheets()
+    sheets = {team: Playsheet.load(team) for team in teams}
+    return {(offense, defense): matchup(sheets[offense], sheets[defense])
+            for offense, defense in itertools.product(teams, repeat=2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact net yardage of every play against every formation")
+    parser.add_argument("offense", help="Team with the ball, e.g. atlanta_falcons")
+    parser.add_argument("defense", help="Defending team, e.g. dallas_cowboys")
+    args = parser.parse_args()
+
+    table = matchup(Playsheet.load(args.offense), Playsheet.load(args.defense))
+    print(f"{'Play':<14}{'Formation':<12}{'Mean':>8}{'SD':>8}{'P(1st)':>8}")
+    for play in OFFENSE_PLAYS:
+        for formation in DEFENSE_PLAYS:
+            cell = table.net_yards(play, formation)
+            print(f"{play:<14}{formation:<12}{cell.mean:>8.2f}{cell.variance ** 0.5:>8.2f}{cell.first_down:>8.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import math
+import os
+import subprocess
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from pd import TEAMS, Playsheet
+from registry import TeamRegistry
+from vector import VectorGames
+
+
+#Normal quantile of the 95% confidence intervals
+Z = 1.96
+
+Estimate = namedtuple("Estimate", ["mean", "half_width", "games"])
+Estimate.__doc__ = """
+Mean of per-game values with its 95% confidence interval
+
+    mean:       Mean over the games
+    half_width: Half the width of the confidence interval
+    games:      Games it is over
+"""
+
+Pairing = namedtuple("Pairing", ["team", "opponent", "win_rate", "margin", "win_rate_change", "margin_change",
+                                 "independent_games"])
+Pairing.__doc__ = """
+Balance of team against opponent, both sides of the ball at home and away
+
+    win_rate:           Estimate of team's wins, a tie counts half
+    margin:             Estimate of team's points less opponent's
+    win_rate_change, margin_change: Estimates of the new playsheets less the
+                        baseline ones on the same draws, None without a baseline
+    independent_games:  Games per version two independent runs would need for
+                        win_rate_change to be as tight, None without a baseline
+"""
+
+
+def estimate(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return Estimate(float(values.mean()) if len(values) else 0.0, math.inf, len(values))
+    return Estimate(float(values.mean()), Z * float(values.std(ddof=1)) / math.sqrt(len(values)), len(values))
+
+
+def outcomes(team_sheet, opponent_sheet, games, seed):
+    """
+    (win values, margins) of team, games // 2 at home and as many away on
+    the same draws, so which side kicks off first cancels out
+    """
+    half = games // 2
+    home, away, _ = VectorGames(None, None, half, seed, sheets=(team_sheet, opponent_sheet)).run()
+    opponent_home, team_away, _ = VectorGames(None, None, half, seed, sheets=(opponent_sheet, team_sheet)).run()
+    margins = np.concatenate([home - away, team_away - opponent_home])
+    return (np.sign(margins) + 1) / 2, margins
+
+
+def measure(team, opponent, sheets, baseline=None, target=0.02, batch=256, max_games=20000, seed=0):
+    """
+    Play team against opponent in batches until the win rate confidence
+    interval, or with a baseline the interval on its change, is no wider
+    than +/- target, or max_games have been played. With a baseline the win
+    rate itself can stay wider than target, its Estimate has the interval
+    and games it reached.
+
+    sheets and baseline are {team: Playsheet}. Each batch is played by both
+    versions on the same draws (common random numbers), so a pairing whose
+    playsheets didn't change gives exactly the same games and stops at the
+    first batch, and a small edit changes only the games it touches
+    """
+    compare = baseline is not None and team in baseline and opponent in baseline
+    wins, margins, win_changes, margin_changes = [], [], [], []
+    old_wins = []
+    seeds = np.random.SeedSequence(seed)
+    while len(wins) < max_games:
+        batch_seed = seeds.spawn(1)[0].generate_state(1)[0]
+        win, margin = outcomes(sheets[team], sheets[opponent], batch, batch_seed)
+        wins.extend(win)
+        margins.extend(margin)
+        if compare:
+            old_win, old_margin = outcomes(baseline[team], baseline[opponent], batch, batch_seed)
+            old_wins.extend(old_win)
+            win_changes.extend(win - old_win)
+            margin_changes.extend(margin - old_margin)
+
+        tracked = estimate(win_changes if compare else wins)
+        if tracked.half_width <= target:
+            break
+
+    independent_games = None
+    if compare:
+        #Two independent runs need games_per_version * var(change) = var(new) + var(old)
+        change_variance = np.var(win_changes, ddof=1)
+        independent_variance = np.var(wins, ddof=1) + np.var(old_wins, ddof=1)
+        if change_variance > 0:
+            independent_games = round(len(wins) * independent_variance / change_variance)
+    return Pairing(team, opponent, estimate(wins), estimate(margins),
+                   estimate(win_changes) if compare else None, estimate(margin_changes) if compare else None,
+                   independent_games)
+
+
+def baseline_sheets(teams, baseline):
+    """
+    {team: Playsheet} of the teams found in baseline, a playsheet directory
+    or a git revision of the playsheets each team is loaded from now
+    """
+    if os.path.isdir(baseline):
+        registry = TeamRegistry(Playsheet.from_entry, [baseline])
+        return {team: registry.load(team) for team in teams if team in registry.index()}
+
+    with tempfile.TemporaryDirectory(prefix="paydirt-baseline-") as directory:
+        return baseline_sheets(export_revision(teams, baseline, directory), directory)
+
+
+def export_revision(teams, revision, directory):
+    """
+    Write each team's playsheet as of git revision to directory, returns the teams found there
+    """
+    found = []
+    for team in teams:
+        path = TEAMS.entry(team).path
+        folder = os.path.dirname(path)
+        try:
+            top = subprocess.run(["git", "-C", folder, "rev-parse", "--show-toplevel"],
+                                 capture_output=True, text=True, check=True).stdout.strip()
+            yaml_text = subprocess.run(["git", "-C", top, "show", f"{revision}:{os.path.relpath(path, top)}"],
+                                       capture_output=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError):
+            #New since baseline, or not under git
+            continue
+        with open(os.path.join(directory, f"{team}.yaml"), "wb") as f:
+            f.write(yaml_text)
+        found.append(team)
+    return found
+
+
+def format_estimate(value, scale=1, sign=""):
+    if value is None:
+        return "-"
+    return f"{value.mean * scale:{sign}.1f}±{value.half_width * scale:.1f}"
+
+
+def print_matrix(title, teams, pairings, field, scale=1, sign=""):
+    """
+    Row team's value against each column team
+    """
+    print(title)
+    width = max(len(team) for team in teams)
+    print(" " * width + "".join(f"{f'[{column}]':>16}" for column in range(len(teams))))
+    for row, team in enumerate(teams):
+        cells = []
+        for opponent in teams:
+            value = getattr(pairings[team, opponent], field) if team != opponent else None
+            cells.append(format_estimate(value, scale, sign))
+        print(f"{team:<{width}}" + "".join(f"{cell:>16}" for cell in cells) + f"  [{row}]")
+    print()
+
+
+def mirror(pairing):
+    """
+    The same pairing from the opponent's side
+    """
+    def flip(value, win=False):
+        if value is None:
+            return None
+        return value._replace(mean=(1 - value.mean) if win else -value.mean)
+    return Pairing(pairing.opponent, pairing.team, flip(pairing.win_rate, True), flip(pairing.margin),
+                   flip(pairing.win_rate_change), flip(pairing.margin_change), pairing.independent_games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Win rates and score margins of every playsheet pairing, "
+                                                 "optionally compared with a baseline version of the playsheets")
+    parser.add_argument("teams", nargs="*", help="Teams to pair up, defaults to every playsheet")
+    parser.add_argument("--playsheets", action="append",
+                        help="Playsheet directory, may be repeated. Defaults to $PAYDIRT_PLAYSHEETS or ./playsheets")
+    parser.add_argument("--baseline", help="Playsheet directory or git revision to compare against, e.g. HEAD")
+    parser.add_argument("--target", type=float, default=0.02,
+                        help="Stop a pairing once its win rate (or win rate change) is known to +/- this")
+    parser.add_argument("--batch", type=int, default=256, help="Games per batch, half at home and half away")
+    parser.add_argument("--max-games", type=int, default=20000, help="Most games per pairing")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the draws")
+    args = parser.parse_args()
+
+    if args.playsheets:
+        TEAMS.set_roots(args.playsheets)
+    teams = args.teams or TEAMS.teams()
+    if len(teams) < 2:
+        parser.error("need at least two teams to pair up")
+    sheets = {team: Playsheet.load(team) for team in teams}
+    baseline = baseline_sheets(teams, args.baseline) if args.baseline else None
+
+    pairings = {}
+    for team, opponent in itertools.combinations(teams, 2):
+        pairing = measure(team, opponent, sheets, baseline, args.target, args.batch, args.max_games, args.seed)
+        pairings[team, opponent] = pairing
+        pairings[opponent, team] = mirror(pairing)
+
+    print_matrix("Win rate % (row team vs column team)", teams, pairings, "win_rate", 100)
+    print_matrix("Score margin (row team less column team)", teams, pairings, "margin", sign="+")
+    if baseline is not None:
+        print_matrix(f"Win rate change % since {args.baseline}", teams, pairings, "win_rate_change", 100, "+")
+        print_matrix(f"Score margin change since {args.baseline}", teams, pairings, "margin_change", sign="+")
+
+    played = [pairings[pair] for pair in itertools.combinations(teams, 2)]
+    games = sum(pairing.win_rate.games for pairing in played)
+    print(f"{games} games per version over {len(played)} pairings, "
+          f"{len(played) * args.max_games} at a fixed --max-games each")
+    for pairing in played:
+        if pairing.win_rate_change is None:
+            continue
+        if pairing.independent_games is None:
+            print(f"{pairing.team} vs {pairing.opponent}: unchanged, the same games in both versions")
+        else:
+            print(f"{pairing.team} vs {pairing.opponent}: {pairing.win_rate.games} paired games, "
+                  f"independent runs would need {pairing.independent_games} per version")
+    #With a baseline a pairing stops on its change, so its win rate can be looser than --target
+    for pairing in played:
+        if pairing.win_rate.half_width > args.target:
+            print(f"{pairing.team} vs {pairing.opponent}: win rate only known to "
+                  f"±{pairing.win_rate.half_width * 100:.1f}% after {pairing.win_rate.games} games")
+
+if __name__ == "__main__":
+    main()
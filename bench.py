@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+#Rendering is benchmarked without a display, must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import yaml
+
+from pd import TEAMS, Game, Playsheet, NullOutput, RandomPlayCaller, list_playsheets, CHART_PLAYS, OFFENSE_PLAYS, DEFENSE_PLAYS
+from dice import make_dice
+from sim import simulate_game
+
+
+Result = namedtuple("Result", ["name", "samples", "ops_per_sec", "p50", "p90", "p99"])
+Result.__doc__ = """
+One benchmark run
+
+    samples:        Samples timed, a batched sample covers several operations
+    ops_per_sec:    Operations per second, one over the mean seconds per operation
+    p50, p90, p99:  Percentiles of the seconds per operation
+"""
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register fn(args, deadline) as a benchmark. It times operations until
+    time.perf_counter() passes deadline and returns a list of seconds per
+    operation, one per timed sample
+    """
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def batched(op, batch, deadline, min_samples=5):
+    """
+    Seconds per op() of batches of batch calls, for ops too quick to time one at a time
+    """
+    samples = []
+    while len(samples) < min_samples or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        for _ in range(batch):
+            op()
+        samples.append((time.perf_counter() - start) / batch)
+    return samples
+
+
+def new_game(args, seed):
+    game = Game(output=NullOutput(), seed=seed, dice=make_dice(seed, buffered=True))
+    game.start_phase(args.home, args.away, RandomPlayCaller(), RandomPlayCaller())
+    return game
+
+
+@benchmark("playsheet_load")
+def playsheet_load(args, deadline):
+    #A fresh Playsheet reads the compiled .pdc cache, Playsheet.load would share one
+    entry = TEAMS.entry(args.home)
+    return batched(lambda: Playsheet.from_entry(entry), 10, deadline)
+
+
+@benchmark("playsheet_compile")
+def playsheet_compile(args, deadline):
+    with open(TEAMS.entry(args.home).path, "rb") as f:
+        yaml_bytes = f.read()
+
+    def compile_playsheet():
+        playsheet = Playsheet.__new__(Playsheet)
+        yaml_data = yaml.safe_load(yaml_bytes)
+        playsheet.team_info = yaml_data['team_info']
+        playsheet.compile(yaml_data)
+    return batched(compile_playsheet, 1, deadline)
+
+
+@benchmark("chart_rolls")
+def chart_rolls(args, deadline):
+    playsheet = Playsheet.load(args.home)
+    dice = make_dice(0, buffered=True)
+    plays = range(len(CHART_PLAYS))
+    matchups = [(formation, play) for formation in range(len(DEFENSE_PLAYS)) for play in range(len(OFFENSE_PLAYS))]
+
+    def roll():
+        for play in plays:
+            playsheet.roll_chart(play, dice)
+        for formation, play in matchups:
+            playsheet.roll_defense(formation, play, dice)
+    #Seconds per single roll
+    calls = len(plays) + len(matchups)
+    return [sample / calls for sample in batched(roll, 100, deadline)]
+
+
+@benchmark("evaluate_play")
+def evaluate_play(args, deadline):
+    samples = []
+    seed = 0
+    while len(samples) < 5 or time.perf_counter() < deadline:
+        game = new_game(args, seed)
+        while not game.game_over:
+            game.pre_play_phase()
+            start = time.perf_counter()
+            result = game.evaluate_play_phase()
+            samples.append(time.perf_counter() - start)
+            game.post_play_phase(result)
+        seed += 1
+    return samples
+
+
+@benchmark("game")
+def game(args, deadline):
+    samples = []
+    seed = 0
+    while len(samples) < 5 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        simulate_game(args.home, args.away, seed)
+        samples.append(time.perf_counter() - start)
+        seed += 1
+    return samples
+
+
+def season_workers(args):
+    """
+    1, 2, 4, ... processes up to and including args.workers
+    """
+    counts = []
+    workers = 1
+    while workers < args.workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [args.workers]
+
+
+def season(workers):
+    def run(args, deadline):
+        from season import run_season
+
+        teams = list_playsheets()
+        samples = []
+        season_seed = 0
+        while len(samples) < 3 or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            results = run_season(teams, args.season_games, season_seed, workers, chunk_size=8)
+            #Seconds per game
+            samples.append((time.perf_counter() - start) / len(results))
+            season_seed += 1
+        return samples
+    return run
+
+
+@benchmark("render_frame")
+def render_frame(args, deadline):
+    import pygame
+    from gui import FootballField
+    from snapshot import SnapshotBuffer
+
+    #Every snapshot of one game, drawn in a loop
+    game = Game(output=NullOutput(), seed=0)
+    game.snapshots = SnapshotBuffer()
+    game.start_phase(args.home, args.away, RandomPlayCaller(), RandomPlayCaller())
+    snapshots = [game.snapshots.latest()[1]]
+    while not game.game_over:
+        game.pre_play_phase()
+        game.post_play_phase(game.evaluate_play_phase())
+        snapshots.append(game.snapshots.latest()[1])
+
+    #pygame stays initialised, gui caches fonts that pygame.quit would invalidate
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    field = FootballField(screen, 800, 600, skip_animations=True)
+    samples = []
+    frame = 0
+    while len(samples) < 5 or time.perf_counter() < deadline:
+        snapshot = snapshots[frame % len(snapshots)]
+        start = time.perf_counter()
+        #draw moves the ball straight to its spot then calls _render_frame
+        field.draw(snapshot)
+        samples.append(time.perf_counter() - start)
+        frame += 1
+    return samples
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(name, fn, args):
+    fn(args, 0)   #Warm up caches and imports
+    samples = fn(args, time.perf_counter() + args.seconds)
+    ordered = sorted(samples)
+    return Result(name, len(samples), len(samples) / sum(samples),
+                  percentile(ordered, 0.5), percentile(ordered, 0.9), percentile(ordered, 0.99))
+
+
+def regressions(results, baseline, threshold):
+    """
+    (name, ops_per_sec, baseline ops_per_sec) of every result slower than
+    its baseline by more than threshold, a fraction of the baseline
+    """
+    slower = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected is not None and result.ops_per_sec < expected["ops_per_sec"] * (1 - threshold):
+            slower.append((result.name, result.ops_per_sec, expected["ops_per_sec"]))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine, playsheet loading and rendering")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, defaults to all of them")
+    parser.add_argument("--home", default="atlanta_falcons", help="Home team playsheet")
+    parser.add_argument("--away", default="dallas_cowboys", help="Away team playsheet")
+    parser.add_argument("--seconds", type=float, default=2, help="Minimum time spent timing each benchmark")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Scale the season benchmark from 1 up to this many processes")
+    parser.add_argument("--season-games", type=int, default=4, help="Games per pairing in the season benchmark")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Fail when ops/sec drops more than this fraction below the baseline")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    benchmarks = dict(BENCHMARKS)
+    for workers in season_workers(args):
+        benchmarks[f"season_w{workers}"] = season(workers)
+    names = args.names or list(benchmarks)
+    unknown = [name for name in names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmarks {', '.join(unknown)}, choose from {', '.join(benchmarks)}")
+
+    print(f"{'Benchmark':<20}{'samples':>10}{'ops/sec':>14}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}")
+    results = []
+    for name in names:
+        result = run(name, benchmarks[name], args)
+        results.append(result)
+        print(f"{result.name:<20}{result.samples:>10}{result.ops_per_sec:>14.1f}"
+              f"{result.p50 * 1e6:>12.1f}{result.p90 * 1e6:>12.1f}{result.p99 * 1e6:>12.1f}")
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({result.name: result._asdict() for result in results})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    slower = regressions(results, baseline, args.threshold)
+    for name, ops_per_sec, expected in slower:
+        print(f"REGRESSION {name}: {ops_per_sec:.1f} ops/sec, baseline {expected:.1f} ({ops_per_sec / expected - 1:+.0%})")
+    if slower:
+        sys.exit(1)
+    print(f"No benchmark more than {args.threshold:.0%} below {args.baseline}")
+
+if __name__ == "__main__":
+    main()
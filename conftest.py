@@ -0,0 +1,2 @@
+#test_gui.py is a script for inspecting the football image, not a test
+collect_ignore = ["test_gui.py"]
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import time
+START = time.perf_counter()
+
+import argparse
+
+from pd import Game, ConsoleOutput, RandomPlayCaller
+
+
+def play(game):
+    """
+    Play game in the terminal until it is over
+    """
+    while not game.game_over:
+        game.pre_play_phase()
+        result = game.evaluate_play_phase()
+        game.post_play_phase(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paydirt Football in the terminal, without pygame")
+    parser.add_argument("user", nargs="?", help="User team playsheet name, asked for when not given")
+    parser.add_argument("comp", nargs="?", help="Computer team playsheet name, asked for when not given")
+    parser.add_argument("-s", "--seed", type=int, help="Seed for the dice and computer play calls")
+    parser.add_argument("--computer", action="store_true", help="Let the computer call the user team's plays too")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Print how long importing the engine and setting up the game took, then exit")
+    parser.add_argument("--win-probability", action="store_true",
+                        help="Print the live win probability, the matchup's table is built on first use")
+    args = parser.parse_args()
+
+    #Team selection asks for input too, so the whole session ends quietly on Ctrl-C or end of input
+    try:
+        game = Game(output=ConsoleOutput(), seed=args.seed)
+        game.start_phase(args.user, args.comp, RandomPlayCaller() if args.computer else None)
+        if args.win_probability:
+            from winprob import matchup_table
+            game.win_table = matchup_table(game.user_team.name, game.comp_team.name)
+        if args.startup_time:
+            print(f"Ready in {(time.perf_counter() - START) * 1000:.1f} ms")
+            return
+
+        play(game)
+    except (KeyboardInterrupt, EOFError):
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import bisect
+import importlib.util
+import itertools
+import random
+
+
+CHART_ROLLS = range(10, 40)    #Offense and special teams dice
+DEFENSE_ROLLS = range(1, 7)    #Defense dice
+
+
+class DiceModel:
+    """
+    Distribution of a chart roll made by adding up dice
+
+    dice is a list of (faces, multiplier). The roll is the sum of every
+    die's face times its multiplier, clamped to rolls.
+
+    Attributes:
+        rolls:          Chart rolls the model produces
+        probabilities:  probabilities[i] is the chance of rolling rolls[i]
+        cumulative:     Running total of probabilities, for inverse CDF sampling
+    """
+
+    def __init__(self, dice, rolls):
+        self.rolls = rolls
+
+        totals = {0: 1.0}
+        for faces, multiplier in dice:
+            next_totals = {}
+            for total, p in totals.items():
+                for face in faces:
+                    value = total + face * multiplier
+                    next_totals[value] = next_totals.get(value, 0.0) + p / len(faces)
+            totals = next_totals
+
+        self.probabilities = [0.0] * len(rolls)
+        for total, p in totals.items():
+            roll = min(max(total, rolls.start), rolls.stop - 1)
+            self.probabilities[roll - rolls.start] += p
+        self.cumulative = list(itertools.accumulate(self.probabilities))
+
+    def index(self, u):
+        """
+        Roll index for a uniform number u in [0, 1)
+        """
+        return min(bisect.bisect_right(self.cumulative, u), len(self.rolls) - 1)
+
+
+#Paydirt offense dice: a black die numbered 1,1,2,2,3,3 for the tens and two
+#white dice numbered 0-5 for the units. A 40 reads as the last chart row.
+OFFENSE_DICE = DiceModel([((1, 1, 2, 2, 3, 3), 10), (range(6), 1), (range(6), 1)], CHART_ROLLS)
+#Defense dice: a red die numbered 1,1,2,2,3,3 plus a green die numbered 0,0,0,1,2,3
+DEFENSE_DICE = DiceModel([((1, 1, 2, 2, 3, 3), 1), ((0, 0, 0, 1, 2, 3), 1)], DEFENSE_ROLLS)
+#Kicks and returns are rolled with the offense dice
+SPECIAL_TEAMS_DICE = OFFENSE_DICE
+
+
+class RandomDice:
+    """
+    Rolls one die total at a time with a random.Random. Used when numpy
+    is not installed
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def offense_roll(self):
+        return OFFENSE_DICE.index(self.rng.random())
+
+    def defense_roll(self):
+        return DEFENSE_DICE.index(self.rng.random())
+
+    def special_teams_roll(self):
+        return SPECIAL_TEAMS_DICE.index(self.rng.random())
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table for sampling a DiceModel in O(1) per roll
+    """
+
+    def __init__(self, model):
+        import numpy as np
+
+        n = len(model.probabilities)
+        scaled = [p * n for p in model.probabilities]
+        self.prob = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            self.prob[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            if scaled[high] < 1.0:
+                small.append(high)
+            else:
+                large.append(high)
+
+    def sample(self, rng, size):
+        import numpy as np
+
+        column = rng.integers(len(self.prob), size=size)
+        return np.where(rng.random(size) < self.prob[column], column, self.alias[column])
+
+
+_alias_tables = {}
+
+def alias_table(model):
+    """
+    AliasTable of model shared by every DiceBuffer in the process, built on first use
+    """
+    table = _alias_tables.get(model)
+    if table is None:
+        table = _alias_tables[model] = AliasTable(model)
+    return table
+
+
+class DiceBuffer:
+    """
+    Dice rolled in numpy batches and handed to the engine one at a time
+
+    Each kind of roll has its own buffer, refilled from the shared
+    AliasTable of its DiceModel when it runs out. Refills start at
+    first_batch rolls, about a game's worth, and double up to batch, so a
+    single game only samples what it uses and long runs still sample in
+    large batches.
+    """
+
+    def __init__(self, seed=None, batch=1 << 14, first_batch=256):
+        import numpy as np
+
+        self.rng = np.random.default_rng(seed)
+        self.batch = batch
+        self.offense_rolls = self.defense_rolls = self.special_teams_rolls = iter(())
+        self.offense_size = self.defense_size = self.special_teams_size = first_batch
+
+    def refill(self, model, size):
+        """
+        (iterator over size new rolls of model, size of the next refill)
+        """
+        return iter(alias_table(model).sample(self.rng, size).tolist()), min(size * 2, self.batch)
+
+    def offense_roll(self):
+        roll = next(self.offense_rolls, None)
+        if roll is None:
+            self.offense_rolls, self.offense_size = self.refill(OFFENSE_DICE, self.offense_size)
+            roll = next(self.offense_rolls)
+        return roll
+
+    def defense_roll(self):
+        roll = next(self.defense_rolls, None)
+        if roll is None:
+            self.defense_rolls, self.defense_size = self.refill(DEFENSE_DICE, self.defense_size)
+            roll = next(self.defense_rolls)
+        return roll
+
+    def special_teams_roll(self):
+        roll = next(self.special_teams_rolls, None)
+        if roll is None:
+            self.special_teams_rolls, self.special_teams_size = self.refill(SPECIAL_TEAMS_DICE,
+                                                                           self.special_teams_size)
+            roll = next(self.special_teams_rolls)
+        return roll
+
+
+def make_dice(seed=None, buffered=False):
+    """
+    RandomDice, standard library only, unless buffered is asked for by
+    batch work playing many games, which gets a DiceBuffer when numpy is
+    available. Interactive games never import numpy for their dice
+    """
+    if not buffered or importlib.util.find_spec("numpy") is None:
+        return RandomDice(random.Random(seed))
+    return DiceBuffer(seed)
+
+
+def main():
+    for name, model in (("Offense", OFFENSE_DICE), ("Defense", DEFENSE_DICE), ("Special teams", SPECIAL_TEAMS_DICE)):
+        print(name)
+        for roll, p in zip(model.rolls, model.probabilities):
+            print(f"  {roll:>3} {p:6.2%} {'#' * round(p * 200)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import json
+import os
+
+import numpy as np
+
+from pd import list_playsheets
+from replay import LOG_PLAYS, LOG_PLAY_IDS, UNKNOWN_PLAY
+from state import PLAY_STATES, EVENTS, snap_event
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+#One row per snap. Game state columns are before the snap, points and event
+#are what the snap produced. Teams, plays and play states are stored as
+#indexes into the tables in schema.json
+COLUMNS = np.dtype([
+    ("game", "u8"), ("snap", "u2"), ("home", "u2"), ("away", "u2"),
+    ("quarter", "u1"), ("seconds", "i2"), ("play_state", "u1"), ("possession", "u1"),
+    ("direction", "i1"), ("down", "u1"), ("distance", "i2"), ("ball_position", "i2"),
+    ("user_play", "u1"), ("comp_play", "u1"), ("user_roll", "i1"), ("comp_roll", "i1"),
+    ("user_yards", "i2"), ("comp_yards", "i2"), ("result", "i2"),
+    ("home_points", "u1"), ("away_points", "u1"), ("event", "u1"),
+])
+
+
+def write_schema(directory, teams):
+    """
+    Write schema.json to directory. Parallel exporters all write the same
+    schema, so it is replaced in one step and readers never see half a file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "schema.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as schema:
+        json.dump({"columns": [[name, COLUMNS[name].str] for name in COLUMNS.names],
+                   "teams": teams, "plays": LOG_PLAYS, "play_states": PLAY_STATES,
+                   "events": EVENTS}, schema, indent=1)
+    os.replace(tmp_path, path)
+
+
+class SnapRecorder:
+    """
+    Game.log for one game, hands every snap to its SnapExporter as a row
+    """
+
+    def __init__(self, exporter, game, game_id):
+        self.exporter = exporter
+        self.game_id = game_id
+        self.home = exporter.team_ids[game.user_team.name]
+        self.away = exporter.team_ids[game.comp_team.name]
+        self.snap = 0
+        self.before = self.capture(game.state)
+
+    @staticmethod
+    def capture(state):
+        return (state.quarter, state.seconds, state.possession, state.direction, state.down,
+                state.distance, state.ball_position, state.score[0], state.score[1])
+
+    def record(self, game, play_state, result):
+        quarter, seconds, possession, direction, down, distance, ball_position, home_score, away_score = self.before
+        after = self.capture(game.state)
+        home_points = after[7] - home_score
+        away_points = after[8] - away_score
+        event = snap_event(PLAY_STATES[play_state], possession, down, home_points, away_points, after[2])
+
+        (user_roll, user_yards), (comp_roll, comp_yards) = game.rolls
+        self.exporter.append((self.game_id, self.snap, self.home, self.away, quarter, seconds, play_state,
+                              possession, direction, down, distance, ball_position,
+                              LOG_PLAY_IDS.get(game.user_team.selected_play, UNKNOWN_PLAY),
+                              LOG_PLAY_IDS.get(game.comp_team.selected_play, UNKNOWN_PLAY),
+                              user_roll, comp_roll, user_yards, comp_yards, result,
+                              home_points, away_points, event))
+        self.snap += 1
+        self.before = after
+
+    def close(self):
+        pass
+
+
+class SnapExporter:
+    """
+    Streams per-snap rows of any number of games to chunked columnar files
+
+    Rows are buffered in a fixed numpy record array of chunk_rows rows and
+    written out whenever it fills, so memory stays the same however many
+    games are exported. format is "parquet" (one row group per chunk),
+    "arrow" (an Arrow IPC file with one record batch per chunk), "npy" (a
+    directory per chunk holding one .npy file per column) or "auto", which
+    is parquet when pyarrow is installed and npy otherwise. Files are named
+    after prefix, and schema.json describes the columns and code tables.
+
+    Attach recorder(game, game_id) as game.log to export a game. Without a
+    game_id the game is numbered by how many games the exporter has recorded.
+    """
+
+    def __init__(self, directory, prefix="snaps", chunk_rows=1 << 16, format="auto"):
+        if format == "auto":
+            format = "parquet" if pa is not None else "npy"
+        if format in ("parquet", "arrow") and pa is None:
+            raise ValueError(f"{format} export needs pyarrow")
+        if format not in ("parquet", "arrow", "npy"):
+            raise ValueError(f"Unknown export format {format}")
+
+        self.directory = directory
+        self.prefix = prefix
+        self.format = format
+        self.rows = np.zeros(chunk_rows, dtype=COLUMNS)
+        self.count = 0
+        self.chunks = 0
+        self.games = 0
+        self.writer = None
+
+        teams = list_playsheets()
+        self.team_ids = {team: index for index, team in enumerate(teams)}
+        write_schema(directory, teams)
+
+    def recorder(self, game, game_id=None):
+        if game_id is None:
+            game_id = self.games
+        self.games += 1
+        return SnapRecorder(self, game, game_id)
+
+    def append(self, row):
+        self.rows[self.count] = row
+        self.count += 1
+        if self.count == len(self.rows):
+            self.flush()
+
+    def flush(self):
+        if not self.count:
+            return
+        rows = self.rows[:self.count]
+        if self.format == "npy":
+            chunk_dir = os.path.join(self.directory, f"{self.prefix}-{self.chunks:05d}")
+            os.makedirs(chunk_dir, exist_ok=True)
+            for name in COLUMNS.names:
+                np.save(os.path.join(chunk_dir, f"{name}.npy"), rows[name])
+        else:
+            table = pa.table({name: rows[name] for name in COLUMNS.names})
+            if self.writer is None:
+                path = os.path.join(self.directory, f"{self.prefix}.{self.format}")
+                if self.format == "parquet":
+                    self.writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    self.writer = pa.ipc.new_file(path, table.schema)
+            self.writer.write_table(table)
+        self.chunks += 1
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_npy(directory, prefix="snaps", columns=None):
+    """
+    {column: array} of every npy chunk in directory, memory mapped
+    """
+    columns = columns or COLUMNS.names
+    chunk_dirs = sorted(entry for entry in os.listdir(directory)
+                        if entry.startswith(f"{prefix}-") and os.path.isdir(os.path.join(directory, entry)))
+    return {name: np.concatenate([np.load(os.path.join(directory, chunk_dir, f"{name}.npy"), mmap_mode="r")
+                                  for chunk_dir in chunk_dirs])
+            for name in columns}
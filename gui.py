@@ -1,4 +1,51 @@
 import pygame
+from collections import OrderedDict
+
+
+#Panel button that fast-forwards to the end of the game instead of calling a play
+SIM_REST = "Sim rest of game"
+
+_fonts = {}
+
+def get_font(name=None, size=24):
+    """Shared pygame font, created once per (name, size)"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        pygame.font.init()
+        font = _fonts[key] = pygame.font.SysFont(name, size)
+    return font
+
+
+class TextCache:
+    """
+    Rendered text surfaces keyed by (font, text, color)
+
+    The same strings are drawn every frame, so each one is rasterized once.
+    Holds at most max_size surfaces, dropping the least recently used.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = font.render(text, True, color)
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+_text_cache = TextCache()
+
+def render_text(font, text, color):
+    """Antialiased text surface from the shared TextCache"""
+    return _text_cache.render(font, text, color)
+
 
 class PlaysheetWindow:
     """A separate window to display the playsheet"""
@@ -18,9 +65,9 @@ class PlaysheetWindow:
         
         # Font
         pygame.font.init()  # Make sure fonts are initialized
-        self.title_font = pygame.font.SysFont(None, 32)
-        self.header_font = pygame.font.SysFont(None, 24)
-        self.play_font = pygame.font.SysFont(None, 20)
+        self.title_font = get_font(None, 32)
+        self.header_font = get_font(None, 24)
+        self.play_font = get_font(None, 20)
         
         # Window state
         self.initialized = False
@@ -51,7 +98,7 @@ class PlaysheetWindow:
         
         # Draw the title
         title_text = "OFFENSE PLAYS" if user_on_offense else "DEFENSE PLAYS"
-        title_surface = self.title_font.render(title_text, True, self.WHITE)
+        title_surface = render_text(self.title_font, title_text, self.WHITE)
         title_rect = pygame.Rect(0, 0, self.width, 40)
         pygame.draw.rect(self.screen, self.DARK_GRAY, title_rect)
         self.screen.blit(title_surface, (self.width // 2 - title_surface.get_width() // 2, 10))
@@ -71,7 +118,7 @@ class PlaysheetWindow:
         # Draw headers
         for i, header in enumerate([headers[0], headers[1]]):
             x_pos = col1_x if i == 0 else col2_x
-            header_surface = self.header_font.render(header, True, self.BLACK)
+            header_surface = render_text(self.header_font, header, self.BLACK)
             self.screen.blit(header_surface, (x_pos, header_y))
         
         # Draw horizontal line below headers
@@ -99,19 +146,19 @@ class PlaysheetWindow:
             pygame.draw.rect(self.screen, self.BLACK, row_rect, 1)  # Border
             
             # Draw play name
-            name_surface = self.play_font.render(play_name, True, self.BLACK)
+            name_surface = render_text(self.play_font, play_name, self.BLACK)
             self.screen.blit(name_surface, (col1_x, y_offset + 6))
             
             # Draw expected yards
             yards_text = f"{expected_yards:+d}" if expected_yards != 0 else "0"
-            yards_surface = self.play_font.render(yards_text, True, self.BLACK)
+            yards_surface = render_text(self.play_font, yards_text, self.BLACK)
             self.screen.blit(yards_surface, (col2_x, y_offset + 6))
             
             y_offset += row_height + 2
             
             # Check if we need to add a scroll mechanism (for future implementation)
             if y_offset > self.height - 40:
-                more_text = self.play_font.render("...", True, self.BLACK)
+                more_text = render_text(self.play_font, "...", self.BLACK)
                 self.screen.blit(more_text, (self.width // 2, y_offset))
                 break
         
@@ -119,7 +166,7 @@ class PlaysheetWindow:
         close_rect = pygame.Rect(self.width - 60, 5, 50, 30)
         pygame.draw.rect(self.screen, self.LIGHT_RED, close_rect)
         pygame.draw.rect(self.screen, self.BLACK, close_rect, 1)
-        close_text = self.play_font.render("Close", True, self.BLACK)
+        close_text = render_text(self.play_font, "Close", self.BLACK)
         self.screen.blit(close_text, (self.width - 45, 12))
         
         # Update the display
@@ -171,11 +218,17 @@ class PlaysheetWindow:
         ]
 
 class FootballField:
+    """
+    Draws the field, ball, scoreboard and playsheet panel
+
+    Drawing never blocks. draw() renders one frame and tick() waits for the
+    next one, so the caller's loop keeps handling input while the ball
+    moves. Ball moves are animated over animation_seconds whatever the
+    distance, or jump straight to the spot with skip_animations.
+    """
     
-    def __init__(self, screen, width, height):
+    def __init__(self, screen, width, height, fps=60, skip_animations=False):
         self.screen = screen
-        self.width = width
-        self.height = height
         
         # Define colors
         self.GREEN = (34, 139, 34)   # Field green
@@ -197,71 +250,173 @@ class FootballField:
             print("Warning: Could not load football image. Using circle instead.")
             self.ball_img = None
         
+        # Create font
+        self.font = get_font(None, 24)
+
+        # Field dimensions and the cached static field layer
+        self.set_size(width, height)
+
+        # Add animation variables
+        self.current_ball_x = self.ENDZONE_WIDTH + 50 * self.YARD_WIDTH  # Start at midfield
+        self.target_ball_x = self.current_ball_x
+        self.start_ball_x = self.current_ball_x
+        self.animation_seconds = 0.5  # Every ball move takes this long
+        self.animation_elapsed = 0.0
+        self.skip_animations = skip_animations
+
+        # Frame clock, tick() caps the frame rate at fps
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+
+        # Plays the user can click on the playsheet panel, None when no call is waiting
+        self.choices = None
+        self.panel_buttons = []
+
+        # What is on the display, used to work out the dirty rectangles of the next frame
+        self.ball_rect = None
+        self.marker_rect = None
+        self.scoreboard_text = None
+        self.playsheet_key = None
+
+    def set_size(self, width, height):
+        """Set the window size, field dimensions and rebuild everything cached for that size"""
+        self.width = width
+        self.height = height
+
         # Field dimensions
         self.SCOREBOARD_HEIGHT = 100
         self.FIELD_HEIGHT = self.height - self.SCOREBOARD_HEIGHT
         self.ENDZONE_WIDTH = 50
         self.YARD_WIDTH = (self.width - 2 * self.ENDZONE_WIDTH) / 100  # Each yard is 7 pixels
-        
-        # Create font
-        self.font = pygame.font.SysFont(None, 24)
+        self.PANEL_WIDTH = 200
 
-        # Add animation variables
-        self.current_ball_x = self.ENDZONE_WIDTH + 50 * self.YARD_WIDTH  # Start at midfield
-        self.target_ball_x = self.current_ball_x
-        self.animation_speed = 0.1  # Adjust this to control animation speed (0.1 = 10% of distance per frame)
+        self.scoreboard_rect = pygame.Rect(0, 0, self.width, self.SCOREBOARD_HEIGHT)
+        self.panel_rect = pygame.Rect(self.width - self.PANEL_WIDTH, self.SCOREBOARD_HEIGHT,
+                                      self.PANEL_WIDTH, self.FIELD_HEIGHT)
+
+        # The field never changes, render it once and blit it
+        self.field_layer = pygame.Surface((self.width, self.height)).convert()
+        self.draw_field(self.field_layer)
+
+        # Semi-transparent yellow line across the field
+        self.marker_surface = pygame.Surface((3, self.FIELD_HEIGHT))
+        self.marker_surface.fill(self.YELLOW)
+        self.marker_surface.set_alpha(128)
+
+        # Nothing on the display matches the new size
+        self.playsheet_key = None
 
     def draw(self, game_state):
         """Draw the complete field with current game state"""
-        # Update target position
+        if self.screen.get_size() != (self.width, self.height):
+            self.set_size(*self.screen.get_size())
+            self.current_ball_x = self.ENDZONE_WIDTH + ((game_state.ball_position + 50) * self.YARD_WIDTH)
+            self.target_ball_x = self.current_ball_x
+
+        # Update target position, a new spot starts a new animation
         target_x = self.ENDZONE_WIDTH + ((game_state.ball_position + 50) * self.YARD_WIDTH)
-        self.target_ball_x = target_x
-        
-        # If ball needs to move, animate it
-        if abs(self.current_ball_x - self.target_ball_x) > 1:
-            self.animate_ball_movement(game_state)
-        else:
-            # Otherwise just render once
-            self._render_frame(game_state)
+        if target_x != self.target_ball_x:
+            self.start_ball_x = self.current_ball_x
+            self.target_ball_x = target_x
+            self.animation_elapsed = 0.0
+            if self.skip_animations:
+                self.current_ball_x = target_x
+
+        self._render_frame(game_state)
+
+    def tick(self):
+        """
+        Wait for the next frame and move the ball along by the time that
+        passed. Returns the seconds since the last tick
+        """
+        seconds = self.clock.tick(self.fps) / 1000
+        self.animate_ball_movement(seconds)
+        return seconds
+
+    @property
+    def animating(self):
+        return self.current_ball_x != self.target_ball_x
 
     def _render_frame(self, game_state):
-        """Helper method to draw a single frame"""
-        self.screen.fill(self.BLACK)
-        self.draw_field()
+        """
+        Helper method to draw a single frame
+
+        The whole window is only redrawn when the playsheet panel changes,
+        which is also the only time the panel surface is rebuilt.
+        Otherwise the ball, first down marker and scoreboard are redrawn
+        where they changed and only those rectangles are updated.
+        """
+        playsheet_key = self.get_playsheet_key(game_state)
+        if playsheet_key != self.playsheet_key:
+            self.panel_surface = self.build_playsheet_panel(game_state)
+            self.screen.blit(self.field_layer, (0, 0))
+            self.marker_rect = self.draw_first_down_marker(game_state)
+            self.ball_rect = self.draw_ball(game_state.ball_position, game_state)
+            self.scoreboard_text = self.draw_scoreboard(game_state)
+            self.draw_playsheet(game_state)
+            self.playsheet_key = playsheet_key
+            pygame.display.flip()
+            return
+
+        dirty = []
+        ball_rect = self.get_ball_rect(game_state)
+        if ball_rect != self.ball_rect:
+            dirty += [self.ball_rect, ball_rect]
+        marker_rect = self.get_marker_rect(game_state)
+        if marker_rect != self.marker_rect:
+            dirty += [rect for rect in (self.marker_rect, marker_rect) if rect]
+        for rect in dirty:
+            self.redraw_field_area(rect, game_state)
+        self.ball_rect = ball_rect
+        self.marker_rect = marker_rect
+
+        if self.get_scoreboard_text(game_state) != self.scoreboard_text:
+            self.scoreboard_text = self.draw_scoreboard(game_state)
+            dirty.append(self.scoreboard_rect)
+
+        if dirty:
+            pygame.display.update(dirty)
+
+    def redraw_field_area(self, rect, game_state):
+        """Redraw everything on the field inside rect, in the same order as a full frame"""
+        self.screen.set_clip(rect)
+        self.screen.blit(self.field_layer, rect, rect)
         self.draw_first_down_marker(game_state)
         self.draw_ball(game_state.ball_position, game_state)
-        self.draw_scoreboard(game_state)
-        self.draw_playsheet(game_state)
-        pygame.display.flip()
+        if rect.colliderect(self.panel_rect):
+            self.draw_playsheet(game_state)
+        self.screen.set_clip(None)
+
+    def draw_field(self, surface):
+        """Draw the basic field with yard lines onto surface"""
+        surface.fill(self.BLACK)
 
-    def draw_field(self):
-        """Draw the basic field with yard lines"""
         # Draw main field (green background)
         field_rect = pygame.Rect(0, self.SCOREBOARD_HEIGHT, self.width, self.FIELD_HEIGHT)
-        pygame.draw.rect(self.screen, self.GREEN, field_rect)
+        pygame.draw.rect(surface, self.GREEN, field_rect)
         
         # Draw end zones
         left_endzone = pygame.Rect(0, self.SCOREBOARD_HEIGHT, self.ENDZONE_WIDTH, self.FIELD_HEIGHT)
         right_endzone = pygame.Rect(self.width - self.ENDZONE_WIDTH, self.SCOREBOARD_HEIGHT, 
                                   self.ENDZONE_WIDTH, self.FIELD_HEIGHT)
-        pygame.draw.rect(self.screen, self.RED, left_endzone)
-        pygame.draw.rect(self.screen, self.BLUE, right_endzone)
+        pygame.draw.rect(surface, self.RED, left_endzone)
+        pygame.draw.rect(surface, self.BLUE, right_endzone)
         
         # Draw yard lines
         for yard in range(10, 100, 10):
             x_pos = self.ENDZONE_WIDTH + (yard * self.YARD_WIDTH)
-            pygame.draw.line(self.screen, self.WHITE, 
+            pygame.draw.line(surface, self.WHITE, 
                            (x_pos, self.SCOREBOARD_HEIGHT),
                            (x_pos, self.height),
                            2)
             
             # Draw yard numbers
             yard_num = str(yard if yard <= 50 else 100 - yard)
-            text = self.font.render(yard_num, True, self.WHITE)
-            self.screen.blit(text, (x_pos - 10, self.SCOREBOARD_HEIGHT + 10))
+            text = render_text(self.font, yard_num, self.WHITE)
+            surface.blit(text, (x_pos - 10, self.SCOREBOARD_HEIGHT + 10))
 
-    def draw_ball(self, ball_position, game_state):
-        """Draw the ball at its current position"""
+    def get_ball_rect(self, game_state):
+        """Screen rectangle the ball covers at its current animated position"""
         y_pos = self.height - self.FIELD_HEIGHT/2
         
         if self.ball_img:
@@ -272,130 +427,175 @@ class FootballField:
                 ball_rect.midright = (int(self.current_ball_x), int(y_pos))
             else:
                 ball_rect.midleft = (int(self.current_ball_x), int(y_pos))
-            
+            return ball_rect
+
+        ball_rect = pygame.Rect(0, 0, 11, 11)
+        ball_rect.center = (int(self.current_ball_x), int(y_pos))
+        return ball_rect
+
+    def draw_ball(self, ball_position, game_state):
+        """Draw the ball at its current position, returns the rectangle it covers"""
+        ball_rect = self.get_ball_rect(game_state)
+        if self.ball_img:
             self.screen.blit(self.ball_img, ball_rect)
         else:
-            pygame.draw.circle(self.screen, (255, 255, 0), (int(self.current_ball_x), int(y_pos)), 5)
+            pygame.draw.circle(self.screen, (255, 255, 0), ball_rect.center, 5)
+        return ball_rect
 
-    def draw_scoreboard(self, game_state):
-        """Draw the scoreboard section"""
-        # Draw scoreboard background
-        score_rect = pygame.Rect(0, 0, self.width, self.SCOREBOARD_HEIGHT)
-        pygame.draw.rect(self.screen, self.GRAY, score_rect)
-        
-        # Draw scores
+    def get_scoreboard_text(self, game_state):
+        """The lines shown on the scoreboard"""
         score_text = f"{game_state.user_team.name}: {game_state.user_team.score}  vs  {game_state.comp_team.name}: {game_state.comp_team.score}"
-        time_text = f"Time: {game_state.seconds // 60}:{game_state.seconds % 60:02d}"
+        if game_state.game_over:
+            time_text = "FINAL"
+        else:
+            time_text = f"Q{game_state.quarter}  Time: {game_state.seconds // 60}:{game_state.seconds % 60:02d}"
+            if game_state.win_probability is not None:
+                time_text += f"    Win: {game_state.user_team.name} {game_state.win_probability:.0%}"
         down_text = f"{game_state.down} and {game_state.distance} on {game_state.convert_yardage()}"
-        
-        score = self.font.render(score_text, True, self.BLACK)
-        time = self.font.render(time_text, True, self.BLACK)
-        down = self.font.render(down_text, True, self.BLACK)
-        
-        self.screen.blit(score, (20, 20))
-        self.screen.blit(time, (20, 45))
-        self.screen.blit(down, (20, 70))
+        return (score_text, time_text, down_text)
+
+    def draw_scoreboard(self, game_state):
+        """Draw the scoreboard section, returns the lines drawn"""
+        # Draw scoreboard background
+        pygame.draw.rect(self.screen, self.GRAY, self.scoreboard_rect)
+        
+        # Draw scores, time and down
+        lines = self.get_scoreboard_text(game_state)
+        for i, line in enumerate(lines):
+            text = render_text(self.font, line, self.BLACK)
+            self.screen.blit(text, (20, 20 + 25 * i))
+        return lines
+
+    def get_marker_rect(self, game_state):
+        """Screen rectangle of the first down marker, None when it is not shown"""
+        # No marker on kicks, tries or first and goal
+        if game_state.down == 0 or abs(game_state.ball_position) > 40:
+            return None
+
+        # The line to gain is distance yards ahead of the ball
+        if game_state.direction == "left":
+            first_down_pos = game_state.ball_position - game_state.distance
+        else:
+            first_down_pos = game_state.ball_position + game_state.distance
+
+        # Convert first down position to screen coordinates
+        x_pos = self.ENDZONE_WIDTH + ((first_down_pos + 50) * self.YARD_WIDTH)
+        return pygame.Rect(int(x_pos) - 1, self.SCOREBOARD_HEIGHT, 3, self.FIELD_HEIGHT)
 
     def draw_first_down_marker(self, game_state):
-        """Draw the first down marker line"""
-        # Calculate the first down position based on ball position and distance
-        if abs(game_state.ball_position) > 40 or abs(game_state.ball_position) < -40:
-            self.first_down_pos = False
+        """Draw the first down marker line, returns its rectangle or None"""
+        marker_rect = self.get_marker_rect(game_state)
+        if marker_rect:
+            self.screen.blit(self.marker_surface, marker_rect)
+        return marker_rect
+
+    def animate_ball_movement(self, seconds):
+        """Move the ball seconds further along its animation towards the target"""
+        if not self.animating:
+            return
+        self.animation_elapsed += seconds
+        progress = self.animation_elapsed / self.animation_seconds
+        if self.skip_animations or progress >= 1:
+            self.current_ball_x = self.target_ball_x
         else:
-            if game_state.direction == "left" and game_state.down == 1:
-                self.first_down_pos = game_state.ball_position - 10
-            elif game_state.direction == "right" and game_state.down == 1:
-                self.first_down_pos = game_state.ball_position + 10
-        
-            # Convert first down position to screen coordinates1
-            x_pos = self.ENDZONE_WIDTH + ((self.first_down_pos + 50) * self.YARD_WIDTH)
-            
-            # Draw a semi-transparent yellow line across the field
-            line_surface = pygame.Surface((3, self.FIELD_HEIGHT))
-            line_surface.fill(self.YELLOW)
-            line_surface.set_alpha(128)  # Make it semi-transparent
-            
-            self.screen.blit(line_surface, (x_pos - 1, self.SCOREBOARD_HEIGHT))
-
-    def animate_ball_movement(self, game_state):
-        """Animate the ball moving to its new position"""
-        # Keep animating until we're very close to the target
-        while abs(self.current_ball_x - self.target_ball_x) > 1:
-            # Update ball position
-            dx = self.target_ball_x - self.current_ball_x
-            self.current_ball_x += dx * self.animation_speed
-            
-            # Draw the current frame
-            self._render_frame(game_state)
-            
-            # Control animation speed
-            pygame.time.wait(33)  # About 30 FPS
-            
-            # Process events to keep the window responsive
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
+            # Ease out, fast off the line and slowing into the spot
+            eased = 1 - (1 - progress) ** 3
+            self.current_ball_x = self.start_ball_x + (self.target_ball_x - self.start_ball_x) * eased
 
-    def draw_playsheet(self, game_state):
-        """Draw the playsheet panel based on offense/defense state"""
+    def get_playsheet(self, game_state):
+        """(user_on_offense, plays) shown on the playsheet panel"""
         # Determine if user is on offense or defense
         user_on_offense = game_state.user_on_offense
-        
-        # Create a semi-transparent panel on the right side
-        panel_width = 200
-        panel_height = self.FIELD_HEIGHT
-        panel_x = self.width - panel_width
-        panel_y = self.SCOREBOARD_HEIGHT
-        
-        # Draw the panel background
-        panel_surface = pygame.Surface((panel_width, panel_height))
-        panel_surface.fill(self.GRAY)
-        panel_surface.set_alpha(200)  # Semi-transparent
-        self.screen.blit(panel_surface, (panel_x, panel_y))
-        
-        # Draw the title
-        title_text = "OFFENSE PLAYS" if user_on_offense else "DEFENSE PLAYS"
-        title = pygame.font.SysFont(None, 28).render(title_text, True, self.BLACK)
-        self.screen.blit(title, (panel_x + 10, panel_y + 10))
-        
+
         # Get the appropriate play list
         if user_on_offense:
             plays = game_state.offense_plays if hasattr(game_state, 'offense_plays') else self.get_sample_offense_plays()
         else:
             plays = game_state.defense_plays if hasattr(game_state, 'defense_plays') else self.get_sample_defense_plays()
+
+        # While a call is waiting show exactly the plays that can be called,
+        # with the expected yards of the ones the playsheet rates
+        if self.choices is not None:
+            rated = {play.get('name'): play for play in plays}
+            plays = [rated.get(play, {'name': play}) for play in self.choices]
+        return user_on_offense, plays
+
+    def get_playsheet_key(self, game_state):
+        """Everything the playsheet panel shows, to tell when it has changed"""
+        user_on_offense, plays = self.get_playsheet(game_state)
+        return (user_on_offense, self.choices is not None,
+                tuple((play.get('name'), play.get('expected_yards')) for play in plays))
+
+    def build_playsheet_panel(self, game_state):
+        """Render the playsheet panel based on offense/defense state onto its own surface"""
+        user_on_offense, plays = self.get_playsheet(game_state)
+        
+        # Create a semi-transparent panel for the right side
+        panel_width = self.panel_rect.width
+        panel_height = self.panel_rect.height
+        panel_surface = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
+        panel_surface.fill(self.GRAY + (200,))  # Semi-transparent
+        
+        # Draw the title
+        title_text = "OFFENSE PLAYS" if user_on_offense else "DEFENSE PLAYS"
+        title = render_text(get_font(None, 28), title_text, self.BLACK)
+        panel_surface.blit(title, (10, 10))
         
         # Draw each play with appropriate color based on expected yardage
+        self.panel_buttons = []
         y_offset = 50
         for i, play in enumerate(plays):
             play_name = play.get('name', f"Play {i+1}")
-            expected_yards = play.get('expected_yards', 0)
+            expected_yards = play.get('expected_yards')
             
             # Choose color based on yardage
-            if expected_yards > 0:
+            if expected_yards is None or expected_yards == 0:
+                color = self.WHITE
+            elif expected_yards > 0:
                 color = self.LIGHT_GREEN
-            elif expected_yards < 0:
-                color = self.LIGHT_RED
             else:
-                color = self.WHITE
+                color = self.LIGHT_RED
             
-            # Draw the play button
-            button_rect = pygame.Rect(panel_x + 10, panel_y + y_offset, panel_width - 20, 30)
-            pygame.draw.rect(self.screen, color, button_rect)
-            pygame.draw.rect(self.screen, self.BLACK, button_rect, 1)  # Border
+            # Draw the play button, remembering where it is on screen for play_at
+            button_rect = pygame.Rect(10, y_offset, panel_width - 20, 30)
+            pygame.draw.rect(panel_surface, color, button_rect)
+            pygame.draw.rect(panel_surface, self.BLACK, button_rect, 1)  # Border
+            self.panel_buttons.append((button_rect.move(self.panel_rect.topleft), play_name))
             
             # Draw play text
-            play_text = f"{play_name} ({expected_yards:+d} yds)"
-            text = self.font.render(play_text, True, self.BLACK)
-            self.screen.blit(text, (panel_x + 15, panel_y + y_offset + 8))
+            play_text = play_name if expected_yards is None else f"{play_name} ({expected_yards:+d} yds)"
+            text = render_text(self.font, play_text, self.BLACK)
+            panel_surface.blit(text, (15, y_offset + 8))
             
             y_offset += 35
             
-            # Stop if we run out of space
-            if y_offset > panel_height - 40:
-                more_text = self.font.render("...", True, self.BLACK)
-                self.screen.blit(more_text, (panel_x + panel_width//2, panel_y + y_offset))
+            # Stop if we run out of space, leaving room for the sim button
+            if y_offset > panel_height - 75:
+                more_text = render_text(self.font, "...", self.BLACK)
+                panel_surface.blit(more_text, (panel_width//2, y_offset))
                 break
+
+        # Sim button along the bottom, only while a call is waiting
+        if self.choices is not None:
+            button_rect = pygame.Rect(10, panel_height - 40, panel_width - 20, 30)
+            pygame.draw.rect(panel_surface, self.YELLOW, button_rect)
+            pygame.draw.rect(panel_surface, self.BLACK, button_rect, 1)
+            self.panel_buttons.append((button_rect.move(self.panel_rect.topleft), SIM_REST))
+            text = render_text(self.font, SIM_REST, self.BLACK)
+            panel_surface.blit(text, (15, panel_height - 32))
+
+        return panel_surface
+
+    def play_at(self, pos):
+        """Name of the playsheet button at screen position pos, or None"""
+        for button_rect, play_name in self.panel_buttons:
+            if button_rect.collidepoint(pos):
+                return play_name
+        return None
+
+    def draw_playsheet(self, game_state):
+        """Draw the cached playsheet panel, rebuilt by _render_frame when the plays change"""
+        self.screen.blit(self.panel_surface, self.panel_rect)
     
     def get_sample_offense_plays(self):
         """Return sample offense plays if game_state doesn't provide them"""
@@ -0,0 +1,193 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+from state import PLAY_STATES, EVENTS, snap_event
+
+
+PHASES = ["pre_play", "evaluate_play", "post_play"]
+
+#Histogram bucket upper bounds in seconds, 1us doubling up to about 17s
+BUCKETS = [1e-6 * 2 ** k for k in range(25)]
+
+
+class Histogram:
+    """
+    Counts of observed durations per BUCKETS bound, plus a +Inf bucket
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def as_dict(self):
+        return {"count": self.count, "sum": self.sum,
+                "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], self.counts))}
+
+
+class Metrics:
+    """
+    Opt-in timing and counters for games and the field
+
+    Nothing is measured until instrument_game or instrument_field is
+    called. Those shadow the instance's phase methods with timed wrappers,
+    so an uninstrumented Game or FootballField runs exactly as before.
+
+    Attributes:
+        wall, cpu:      {phase: Histogram} of wall and thread CPU seconds
+                        per call of each Game phase
+        frames:         Histogram of FootballField._render_frame wall seconds
+        transitions:    {(play_state before, play_state after): count}
+        events:         {event: count} of touchdowns, field goals, turnovers
+                        on downs and the other state.EVENTS
+    """
+
+    def __init__(self):
+        self.wall = {phase: Histogram() for phase in PHASES}
+        self.cpu = {phase: Histogram() for phase in PHASES}
+        self.frames = Histogram()
+        self.transitions = {}
+        self.events = {event: 0 for event in EVENTS[1:]}
+        self.lock = threading.Lock()
+
+    def timed(self, phase, method):
+        wall = self.wall[phase]
+        cpu = self.cpu[phase]
+
+        def timed_phase(*args):
+            start_wall = time.perf_counter()
+            start_cpu = time.thread_time()
+            try:
+                return method(*args)
+            finally:
+                end_wall = time.perf_counter()
+                end_cpu = time.thread_time()
+                with self.lock:
+                    wall.observe(end_wall - start_wall)
+                    cpu.observe(end_cpu - start_cpu)
+        return timed_phase
+
+    def instrument_game(self, game):
+        game.pre_play_phase = self.timed("pre_play", game.pre_play_phase)
+        game.evaluate_play_phase = self.timed("evaluate_play", game.evaluate_play_phase)
+        post_play_phase = self.timed("post_play", game.post_play_phase)
+
+        def counted_post_play_phase(result):
+            state = game.state
+            before = (PLAY_STATES[state.play_state], state.possession, state.down, state.score[0], state.score[1])
+            post_play_phase(result)
+            play_state, possession, down, user_score, comp_score = before
+            event = snap_event(play_state, possession, down, state.score[0] - user_score,
+                               state.score[1] - comp_score, state.possession)
+            transition = (play_state, PLAY_STATES[state.play_state])
+            with self.lock:
+                self.transitions[transition] = self.transitions.get(transition, 0) + 1
+                if event:
+                    self.events[EVENTS[event]] += 1
+
+        game.post_play_phase = counted_post_play_phase
+        return game
+
+    def instrument_field(self, field):
+        render_frame = field._render_frame
+
+        def timed_render_frame(game_state):
+            start = time.perf_counter()
+            try:
+                return render_frame(game_state)
+            finally:
+                seconds = time.perf_counter() - start
+                with self.lock:
+                    self.frames.observe(seconds)
+
+        field._render_frame = timed_render_frame
+        return field
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "wall_seconds": {phase: histogram.as_dict() for phase, histogram in self.wall.items()},
+                "cpu_seconds": {phase: histogram.as_dict() for phase, histogram in self.cpu.items()},
+                "render_frame_seconds": self.frames.as_dict(),
+                "play_state_transitions": [{"from": str(before), "to": str(after), "count": count}
+                                           for (before, after), count in self.transitions.items()],
+                "events": dict(self.events),
+            }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=1)
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format
+        """
+        lines = []
+
+        def histogram(name, histogram, labels=""):
+            total = 0
+            for bound, count in zip([*map(str, BUCKETS), "+Inf"], histogram.counts):
+                total += count
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {total}')
+            labels = labels.rstrip(",")
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        with self.lock:
+            for clock, histograms in (("wall", self.wall), ("cpu", self.cpu)):
+                name = f"paydirt_phase_{clock}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                for phase, phase_histogram in histograms.items():
+                    histogram(name, phase_histogram, f'phase="{phase}",')
+            lines.append("# TYPE paydirt_render_frame_seconds histogram")
+            histogram("paydirt_render_frame_seconds", self.frames)
+
+            lines.append("# TYPE paydirt_play_state_transitions_total counter")
+            for (before, after), count in self.transitions.items():
+                lines.append(f'paydirt_play_state_transitions_total{{from="{before}",to="{after}"}} {count}')
+            lines.append("# TYPE paydirt_events_total counter")
+            for event, count in self.events.items():
+                lines.append(f'paydirt_events_total{{event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Write to path, Prometheus text for a .prom file and JSON otherwise.
+        The file is replaced in one step so readers never see half a dump
+        """
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as dump_file:
+            dump_file.write(text)
+        os.replace(tmp_path, path)
+
+
+class PeriodicDump:
+    """
+    Background thread calling metrics.dump(path) every interval seconds,
+    and once more when stopped
+    """
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.dump(self.path)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.metrics.dump(self.path)
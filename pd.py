@@ -1,28 +1,301 @@
 #!/usr/bin/env python3
 
-import pygame
-import yaml
+#Only the standard library is imported up front so headless games and pool
+#workers start fast. yaml, termcolor, asyncio and the pygame runtime are
+#imported where they are first needed
 import os
-from termcolor import colored
+import sys
+import json
+import struct
+import hashlib
 import random
-from gui import FootballField
+from array import array
+from collections import namedtuple
+from dice import CHART_ROLLS, DEFENSE_ROLLS, make_dice
+from snapshot import GameSnapshot, TeamSnapshot
+from state import GameState, PLAY_STATES, PLAY_STATE_IDS, USER, COMP
+from operator import attrgetter
+from registry import TeamRegistry
+
+
+OFFENSE_PLAYS = ["Line Plunge", "Off Tackle", "End Run", "Draw", "Screen",
+                 "Short Pass", "Medium Pass", "Long", "Sideline"]
+DEFENSE_PLAYS = ["Standard", "Nickel", "Dime", "Prevent", "Blitz"]
+SPECIAL_TEAMS_PLAYS = ["Kickoff", "Kickoff Return", "Punt", "Punt Return", "Int Return", "Field Goal"]
+
+#Compiled playsheet ids. Offense plays come first so an offense play id
+#is also its column in the defense chart
+CHART_PLAYS = OFFENSE_PLAYS + SPECIAL_TEAMS_PLAYS
+PLAY_IDS = {play: index for index, play in enumerate(CHART_PLAYS)}
+FORMATION_IDS = {formation: index for index, formation in enumerate(DEFENSE_PLAYS)}
+
+GameSummary = namedtuple("GameSummary", ["state", "plays", "user_points", "comp_points", "game_over"])
+GameSummary.__doc__ = """
+Result of Game.fast_forward
+
+    state:                      Copy of the GameState it stopped at
+    plays:                      Snaps played
+    user_points, comp_points:   Points each team scored while fast forwarding
+    game_over:                  True when it played to the end of the game
+"""
+
+
+def list_playsheets():
+    """
+    Ids of every team in the TEAMS registry
+    """
+    return TEAMS.teams()
+
+
+class ConsoleOutput:
+    """
+    Output sink that prints game messages to the terminal in color
+    """
+    enabled = True
+
+    def style(self, text, color=None, on_color=None, attrs=None):
+        from termcolor import colored
+        return colored(text, color, on_color, attrs=attrs)
+
+    def write(self, text, color=None, on_color=None, attrs=None):
+        if color or on_color or attrs:
+            text = self.style(text, color, on_color, attrs)
+        print(text)
+
+
+class NullOutput:
+    """
+    Output sink that drops every message. Used for headless simulation
+    """
+    enabled = False
+
+    def style(self, text, color=None, on_color=None, attrs=None):
+        return text
+
+    def write(self, text, color=None, on_color=None, attrs=None):
+        pass
+
+
+class PlayCaller:
+    """
+    Strategy used by a team to call its plays
+
+    select_play receives the game, the team calling the play and the
+    list of plays it may choose from, and returns one of those plays
+    """
+
+    def select_play(self, game, team, plays):
+        raise NotImplementedError
+
+    async def select_play_async(self, game, team, plays):
+        """
+        Awaited by Game.select_plays_async. Callers that answer straight
+        away don't need to override it
+        """
+        return self.select_play(game, team, plays)
+
+
+class ConsolePlayCaller(PlayCaller):
+    """
+    Human play caller, prompts for a play on stdin
+    """
+
+    def select_play(self, game, team, plays):
+        play_choices = ""
+        for index, play in enumerate(plays):
+            play_choices = play_choices + f"[{index}]: {play}\n"
+
+        num_plays = len(plays)
+        while True:
+            user_input = input(play_choices)
+            try:
+                num=int(user_input)
+                if not 0 <= num < num_plays:
+                    continue
+                break
+            except ValueError:
+                print("Enter a valid number")
+
+        return plays[num]
+
+
+class RandomPlayCaller(PlayCaller):
+    """
+    Computer play caller, picks a random play with the game's rng
+
+    Like the original computer it never punts or kicks a field goal
+    on a scrimmage down
+    """
+
+    def select_play(self, game, team, plays):
+        choices = [play for play in plays if play not in Game.SP_OFFENSE_PLAYS]
+        return game.rng.choice(choices or plays)
 
 
 class Playsheet:
-    
-    def __init__(self, yaml_file):
+    """
+    Team playsheet loaded from yaml
 
-        #yaml_file_path = f"/home/nickflo/newpaydirt/playsheets/{yaml_file}"
-        yaml_file_path = f"./playsheets/{yaml_file}"
-    
-        with open(yaml_file_path, 'r') as f:
-            self.yaml_data = yaml.safe_load(f)
+    The charts are compiled once into flat int16 tables so rolling a play
+    is a single index:
+        chart:          row per CHART_PLAYS id, one column per CHART_ROLLS roll
+        defense_chart:  row per (formation id, offense play id), one column
+                        per DEFENSE_ROLLS roll
 
-        self.team_info = self.yaml_data['team_info']
-        self.offense = self.yaml_data['offense']
-        self.defense = self.yaml_data['defense']
-        self.special_teams = self.yaml_data['special_teams']
+    The compiled tables are cached next to the yaml file in a .pdc file keyed
+    by the yaml content hash, and Playsheet.load shares one read-only instance
+    per playsheet across every Team in the process through the TEAMS registry.
 
+    When content_hash is already known, from the registry index, a valid
+    cache is loaded without reading the yaml at all.
+    """
+
+    CACHE_MAGIC = b"PDSHEET1"
+    CACHE_HEADER = struct.Struct("<8s32sIII")   #magic, sha256, team_info, chart and defense_chart lengths
+
+    def __init__(self, yaml_file_path, content_hash=None, cache_path=None):
+        self.content_hash = content_hash
+        self.cache_path = cache_path or os.path.splitext(yaml_file_path)[0] + ".pdc"
+        if content_hash is not None and self.read_cache(self.cache_path):
+            return
+
+        with open(yaml_file_path, 'rb') as f:
+            yaml_bytes = f.read()
+        self.content_hash = hashlib.sha256(yaml_bytes).hexdigest()
+
+        if not self.read_cache(self.cache_path):
+            import yaml
+            yaml_data = yaml.safe_load(yaml_bytes)
+            self.team_info = yaml_data['team_info']
+            self.compile(yaml_data)
+            self.write_cache(self.cache_path)
+
+    @classmethod
+    def from_entry(cls, entry):
+        """
+        Playsheet of a registry.TeamEntry
+        """
+        return cls(entry.path, entry.content_hash, entry.cache_path)
+
+    @classmethod
+    def from_tables(cls, team_info, content_hash, chart, defense_chart):
+        """
+        Playsheet over already compiled int16 tables, which are not copied
+        """
+        playsheet = cls.__new__(cls)
+        playsheet.team_info = team_info
+        playsheet.content_hash = content_hash
+        playsheet.cache_path = None
+        playsheet.set_charts(chart, defense_chart)
+        return playsheet
+
+    @staticmethod
+    def load(team):
+        """
+        Shared Playsheet for team, compiled at most once per process
+        """
+        return TEAMS.load(team)
+
+    @property
+    def nbytes(self):
+        return self.chart.nbytes + self.defense_chart.nbytes + len(json.dumps(self.team_info))
+
+    def compile(self, yaml_data):
+        chart = array("h")
+        for play in CHART_PLAYS:
+            section = yaml_data['offense'] if play in OFFENSE_PLAYS else yaml_data['special_teams']
+            chart.extend(self.chart_row(section, play, CHART_ROLLS))
+
+        defense_chart = array("h")
+        for formation in DEFENSE_PLAYS:
+            for play in OFFENSE_PLAYS:
+                defense_chart.extend(self.chart_row(yaml_data['defense'][formation], play, DEFENSE_ROLLS))
+
+        self.set_charts(chart, defense_chart)
+
+    def set_charts(self, chart, defense_chart):
+        #Read-only views so a shared playsheet can't be changed by one game
+        self.chart = memoryview(chart).toreadonly()
+        self.defense_chart = memoryview(defense_chart).toreadonly()
+
+    def read_cache(self, cache_path):
+        """
+        Load the compiled charts from cache_path, returns False if the cache
+        is missing or was built from different yaml
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                data = f.read()
+            magic, digest, info_len, chart_len, defense_len = Playsheet.CACHE_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return False
+
+        if magic != Playsheet.CACHE_MAGIC or digest.hex() != self.content_hash:
+            return False
+        if chart_len != len(CHART_PLAYS) * len(CHART_ROLLS) or \
+           defense_len != len(DEFENSE_PLAYS) * len(OFFENSE_PLAYS) * len(DEFENSE_ROLLS):
+            return False
+        if len(data) != Playsheet.CACHE_HEADER.size + info_len + 2 * (chart_len + defense_len):
+            return False
+
+        offset = Playsheet.CACHE_HEADER.size
+        self.team_info = json.loads(data[offset:offset + info_len])
+        offset += info_len
+        chart = array("h", data[offset:offset + 2 * chart_len])
+        offset += 2 * chart_len
+        defense_chart = array("h", data[offset:])
+        if sys.byteorder == "big":
+            chart.byteswap()
+            defense_chart.byteswap()
+
+        self.set_charts(chart, defense_chart)
+        return True
+
+    def write_cache(self, cache_path):
+        info = json.dumps(self.team_info).encode()
+        chart = array("h", self.chart)
+        defense_chart = array("h", self.defense_chart)
+        if sys.byteorder == "big":
+            chart.byteswap()
+            defense_chart.byteswap()
+
+        header = Playsheet.CACHE_HEADER.pack(Playsheet.CACHE_MAGIC, bytes.fromhex(self.content_hash),
+                                             len(info), len(chart), len(defense_chart))
+        #Write then rename so a concurrent reader never sees half a file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(header + info + chart.tobytes() + defense_chart.tobytes())
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            #A read-only playsheet directory just means no cache
+            pass
+
+    def chart_row(self, section, play, rolls):
+        row = section[play]
+        if sorted(row) != list(rolls):
+            raise ValueError(f"{self.team_info['name']} {play} chart must have rolls {rolls.start}-{rolls.stop - 1}")
+        return [row[roll] for roll in rolls]
+
+    def roll_chart(self, play_id, dice):
+        """
+        Roll an offense or special teams play, returns (roll, yards)
+        """
+        index = dice.offense_roll() if play_id < len(OFFENSE_PLAYS) else dice.special_teams_roll()
+        return CHART_ROLLS.start + index, self.chart[play_id * len(CHART_ROLLS) + index]
+
+    def roll_defense(self, formation_id, play_id, dice):
+        """
+        Roll a defensive formation against an offense play, returns (roll, yards)
+        """
+        index = dice.defense_roll()
+        row = formation_id * len(OFFENSE_PLAYS) + play_id
+        return DEFENSE_ROLLS.start + index, self.defense_chart[row * len(DEFENSE_ROLLS) + index]
+
+
+
+#Every playsheet under $PAYDIRT_PLAYSHEETS, or ./playsheets next to pd.py
+TEAMS = TeamRegistry(Playsheet.from_entry)
 
 
 class Team:
@@ -31,17 +304,47 @@ class Team:
 
     Attributes:
         name:       Team Name
-        teamsheet:  Teams Playsheet
-        score:      Team score
-        timeouts:   Timeouts remaining 
+        teamsheet:  Teams Playsheet, shared with every Team of the same name
+        score:      Team score, kept in the game's GameState
+        timeouts:   Timeouts remaining, kept in the game's GameState
+        play_caller: PlayCaller that selects this team's plays
+        state:      GameState holding the score and timeouts
+        side:       USER or COMP, this team's place in state
     """
-    def __init__(self, team_name):
+    def __init__(self, team_name, play_caller=None, state=None, side=USER):
         self.name = team_name
-        self.teamsheet = Playsheet(f"{self.name}.yaml")
-        self.score = 0
-        self.timeouts = 3
+        self.teamsheet = Playsheet.load(self.name)
+        self.state = state if state is not None else GameState()
+        self.side = side
         #self.possesion = False
         self.selected_play = ""
+        self.play_caller = play_caller
+
+    @property
+    def score(self):
+        return self.state.score[self.side]
+
+    @score.setter
+    def score(self, score):
+        self.state.score[self.side] = score
+
+    @property
+    def timeouts(self):
+        return self.state.timeouts[self.side]
+
+    @timeouts.setter
+    def timeouts(self, timeouts):
+        self.state.timeouts[self.side] = timeouts
+
+
+def state_slot(name):
+    """
+    Game attribute stored in Game.state
+    """
+    def set_slot(game, value):
+        setattr(game.state, name, value)
+    return property(attrgetter(f"state.{name}"), set_slot)
+
 
 class Game:
     """
@@ -51,23 +354,45 @@ class Game:
         home_team:  Team instance for home player
         away_team:  Team instance for away player
         ball_position: Position of ball
+        state:      GameState the game runs on. ball_position, down, distance,
+                    quarter, seconds, game_over, play_state, possession and
+                    direction read and write it
+        output:     Sink for game messages, NullOutput runs silently
+        rng:        random.Random used for computer play calls
+        dice:       Dice the playsheet rolls are made with, see dice.make_dice
+        snapshots:  SnapshotBuffer a GameSnapshot is published to after every play, or None
+        log:        replay.GameLog every snap is appended to, or None
+        rolls:      (user_roll, comp_roll) of the last play, each (roll, yards)
+        win_table:  winprob.WinTable of the matchup the live win probability
+                    is looked up in, or None to show none
     """
     
     KICKOFF_PLAYS  = ["Kickoff", "Onside Kick"]
     KICKOFF_RETURN_PLAYS = ["Kickoff Return"]
-    OFFENSE_PLAYS = ["Line Plunge", "Off Tackle", "End Run", "Draw", "Screen",
-                      "Short Pass", "Medium Pass", "Long", "Sideline"]
+    OFFENSE_PLAYS = OFFENSE_PLAYS
     SP_OFFENSE_PLAYS = ["Field Goal", "Punt"]
-    DEFENSE_PLAYS  = ["Standard", "Nickel", "Dime", "Prevent", "Blitz"]
+    DEFENSE_PLAYS  = DEFENSE_PLAYS
     POST_TD_PLAYS = ["2pt Attempt", "XP"]
 
-    def __init__(self):
+    QUARTERS = 4
+    QUARTER_SECONDS = 15*60
+
+    ball_position = state_slot("ball_position")
+    down = state_slot("down")
+    distance = state_slot("distance")
+    quarter = state_slot("quarter")
+    seconds = state_slot("seconds")
+    game_over = state_slot("game_over")
+
+    def __init__(self, output=None, seed=None, dice=None):
+        self.state = GameState()
+
         #Initial game state is for kickoff
         self.ball_position = 15              #Think 50yd line will map to 0. So for kickoff 35-> (15 or -15)
         self.down = 0 
         self.distance = 0
         self.quarter = 1
-        self.seconds = 15*60  #Quarter is 15 min long. 10 second increments
+        self.seconds = Game.QUARTER_SECONDS  #Quarter is 15 min long. 10 second increments
         self.game_over = False
         self.user_team = False
         self.comp_team = False #TODO should i show these here even tho they get set later?
@@ -78,6 +403,14 @@ class Game:
         #TODO game has a direction it is being played in
         self.direction = "right"   #Game starts moving left to right
 
+        self.output = output if output is not None else ConsoleOutput()
+        self.rng = random.Random(seed)
+        self.dice = dice if dice is not None else make_dice(seed)
+        self.snapshots = None
+        self.log = None
+        self.rolls = None
+        self.win_table = None
+
     
     def run_game(self):
         """
@@ -107,29 +440,33 @@ class Game:
             result = self.evaluate_play_phase()  #Net yards from play
             self.post_play_phase(result)
 
-    def start_phase(self, user_team=False, comp_team=False):
+    def start_phase(self, user_team=False, comp_team=False, user_caller=None, comp_caller=None):
         """
         User selects a team and selects computer team
         Setup for kickoff
+
+        user_caller and comp_caller default to a console prompt for the
+        user and random plays for the computer
         """
 
-        if not user_team and comp_team:
+        if not (user_team and comp_team):
             user_team, comp_team = self.select_teams()
-        self.user_team = Team(user_team)
-        self.comp_team = Team(comp_team)
+        self.user_team = Team(user_team, user_caller or ConsolePlayCaller(), self.state, USER)
+        self.comp_team = Team(comp_team, comp_caller or RandomPlayCaller(), self.state, COMP)
         
         #User team will just start with ball for now
         #TODO Coin toss
         #TODO Game options like quarter length?
         self.possession = self.user_team
         self.setup_kickoff()
+        self.publish()
 
     def select_teams(self):
         """
-        Team selection based on playbooks in /playsheets
+        Team selection based on the playsheets in TEAMS
         """
 
-        playsheets = [x.split(".yaml")[0] for x in os.listdir("/home/nickflo/newpaydirt/playsheets") if x.endswith("yaml")]
+        playsheets = list_playsheets()
         
         print("Select a user team")
         user_team = self.select_team(playsheets)
@@ -186,55 +523,76 @@ class Game:
         self.select_plays()
         self.print_play_selection()
 
+    async def pre_play_phase_async(self):
+        """
+        pre_play_phase for the asyncio runtime, play callers are awaited
+        """
+        self.print_game_state()
+        await self.select_plays_async()
+        self.print_play_selection()
+
     def print_play_selection(self):
+        if not self.output.enabled:
+            return
         user_string = f"{self.user_team.name} selected {self.user_team.selected_play}"
-        print(f'{colored(user_string, "red", "on_white", attrs=["bold"])}')
+        self.output.write(user_string, "red", "on_white", attrs=["bold"])
         comp_string = f"{self.comp_team.name} selected {self.comp_team.selected_play}"
-        print(f'{colored(comp_string, "blue", "on_white", attrs=["bold"])}')
+        self.output.write(comp_string, "blue", "on_white", attrs=["bold"])
 
 
     def select_plays(self):
         """
-        User selects play based on play_state
-            TODO handle punts/field goals
-        Select a random play for a computer
-        
-        Returns user_play and comp_play
+        Each team's play caller selects a play based on play_state
+        """
+        calls = self.play_calls()
+        try:
+            team, plays = next(calls)
+            while True:
+                team, plays = calls.send(team.play_caller.select_play(self, team, plays))
+        except StopIteration:
+            pass
+
+    async def select_plays_async(self):
+        """
+        select_plays for the asyncio runtime, awaiting each play caller
+        """
+        calls = self.play_calls()
+        try:
+            team, plays = next(calls)
+            while True:
+                team, plays = calls.send(await team.play_caller.select_play_async(self, team, plays))
+        except StopIteration:
+            pass
+
+    def play_calls(self):
+        """
+        Generator holding the play selection rules. Yields (team, plays)
+        for every call a play caller has to make and is sent the play
+        chosen, then sets each team's selected_play
         """
-
-        play_choices = ""
-        num_plays = 0
 
         if self.play_state == "kickoff":
             if self.possession == self.user_team:
-                plays = Game.KICKOFF_RETURN_PLAYS
+                user_play = yield self.user_team, Game.KICKOFF_RETURN_PLAYS
+                comp_play = yield self.comp_team, self.kickoff_plays()
             elif self.possession == self.comp_team:
-                plays = Game.KICKOFF_PLAYS
-
-            for index,play in enumerate(plays):
-                play_choices = play_choices + f"[{index}]: {play}\n"
-            comp_play = "Kickoff Return"
+                user_play = yield self.user_team, self.kickoff_plays()
+                comp_play = yield self.comp_team, Game.KICKOFF_RETURN_PLAYS
 
         elif self.play_state == "offense":
-            plays = Game.OFFENSE_PLAYS + Game.SP_OFFENSE_PLAYS
-            for index,play in enumerate(plays):
-                play_choices = play_choices + f"[{index}]: {play}\n"
-            comp_play = random.choice(Game.DEFENSE_PLAYS)
+            user_play = yield self.user_team, Game.OFFENSE_PLAYS + Game.SP_OFFENSE_PLAYS
+            comp_play = yield self.comp_team, Game.DEFENSE_PLAYS
 
         elif self.play_state == "defense":
-            plays = Game.DEFENSE_PLAYS
-            for index,play in enumerate(plays):
-                play_choices = play_choices + f"[{index}]: {play}\n"
-            comp_play = random.choice(Game.OFFENSE_PLAYS)
+            user_play = yield self.user_team, Game.DEFENSE_PLAYS
+            comp_play = yield self.comp_team, Game.OFFENSE_PLAYS + Game.SP_OFFENSE_PLAYS
 
         elif self.play_state == "post_touchdown":
             if self.possession == self.user_team:
-                plays = Game.POST_TD_PLAYS
-                for index,play in enumerate(plays):
-                    play_choices = play_choices + f"[{index}]: {play}\n"
+                user_play = yield self.user_team, Game.POST_TD_PLAYS
                 comp_play = "Field Goal"
             elif self.possession == self.comp_team:
-                comp_play = random.choice(Game.POST_TD_PLAYS)
+                comp_play = yield self.comp_team, Game.POST_TD_PLAYS
                 if comp_play == "XP":
                     self.play_state = "XP"
                     self.user_team.selected_play = "Field Goal"
@@ -242,47 +600,46 @@ class Game:
                     return
                 elif comp_play == "2pt Attempt":
                     self.play_state = "2pt Attempt"
-                    print(f"{self.possession.name} are going for 2")
-                    plays =  Game.DEFENSE_PLAYS
-                    for index,play in enumerate(plays):
-                        play_choices = play_choices + f"[{index}]: {play}\n"
-                    comp_play = random.choice(Game.OFFENSE_PLAYS)
+                    self.output.write(f"{self.possession.name} are going for 2")
+                    user_play = yield self.user_team, Game.DEFENSE_PLAYS
+                    comp_play = yield self.comp_team, Game.OFFENSE_PLAYS
                 #We need to know if comp is going for 1 or 2 to be able to select a play
             
-        user_play = self.user_play_selection(play_choices, plays)
-        user_play, comp_play = self.check_post_td_play(play_choices, plays,  user_play, comp_play)
+        user_play, comp_play = yield from self.check_post_td_play(user_play, comp_play)
         user_play, comp_play = self.check_for_field_goal(user_play, comp_play)
+        user_play, comp_play = self.check_for_punt(user_play, comp_play)
 
         self.user_team.selected_play = user_play
         self.comp_team.selected_play = comp_play
 
 
+    def kickoff_plays(self):
+        #Onside Kick has no playsheet chart yet so only offer kicks the team can roll
+        return [play for play in Game.KICKOFF_PLAYS if play in PLAY_IDS]
+
     def check_for_field_goal(self, user_play, comp_play):
-        if user_play == "Field Goal":
+        #Either side can attempt a field goal from a scrimmage down
+        if self.play_state in ("offense", "defense") and "Field Goal" in (user_play, comp_play):
+            user_play = "Field Goal"
             comp_play = "Field Goal"
             self.play_state = "Field Goal"
 
         return user_play, comp_play
 
-    def user_play_selection(self, play_choices, plays):
-
-        num_plays = len(plays)
-        while True:
-            user_input = input(play_choices)
-            try:
-                num=int(user_input)
-                if not 0 <= num < num_plays:
-                    continue
-                break
-            except ValueError:
-                print("Enter a valid number")
-
-        selected_play = plays[num]
+    def check_for_punt(self, user_play, comp_play):
+        #Receiving team rolls its punt return against the punt
+        if self.play_state in ("offense", "defense") and "Punt" in (user_play, comp_play):
+            if self.possession == self.user_team:
+                user_play, comp_play = "Punt", "Punt Return"
+            else:
+                user_play, comp_play = "Punt Return", "Punt"
+            self.play_state = "Punt"
 
-        return selected_play
+        return user_play, comp_play
 
 
-    def check_post_td_play(self, play_choices, plays, user_play, comp_play=False):
+    def check_post_td_play(self, user_play, comp_play=False):
+        #Part of play_calls, yields the extra calls of a 2pt attempt
         #We have to convert the play selection to actual playsheet play
         if user_play == "XP":
             user_play = "Field Goal"
@@ -290,13 +647,8 @@ class Game:
         elif user_play == "2pt Attempt":
             #Allow user to select an offensive play if they go for 2
             self.play_state = "2pt Attempt"
-            plays = Game.OFFENSE_PLAYS
-            play_choices = ""
-            for index,play in enumerate(plays):
-                play_choices = play_choices + f"[{index}]: {play}\n"
-            comp_play = random.choice(Game.DEFENSE_PLAYS)
-
-            user_play = self.user_play_selection(play_choices, plays)
+            user_play = yield self.user_team, Game.OFFENSE_PLAYS
+            comp_play = yield self.comp_team, Game.DEFENSE_PLAYS
         
         return user_play, comp_play
 
@@ -313,40 +665,43 @@ class Game:
         Update game state
         """
 
-        user_play_outcomes = self.get_play_outcomes(self.user_team)
-        comp_play_outcomes = self.get_play_outcomes(self.comp_team)
+        user_sheet = self.user_team.teamsheet
+        comp_sheet = self.comp_team.teamsheet
+        user_play = self.user_team.selected_play
+        comp_play = self.comp_team.selected_play
 
         #TODO check for all non-yardage scenarios (need to add these to playsheet) 
         #Need to handle special roll for if user/comp is on defense
         if self.play_state == "offense" or self.play_state == "2pt Attempt":
             #Check for if computer is going for 2
             if self.possession == self.comp_team:
-                user_roll = random.choice(list(user_play_outcomes[self.comp_team.selected_play].items()))
-                comp_roll = random.choice(list(comp_play_outcomes.items()))
+                user_roll = user_sheet.roll_defense(FORMATION_IDS[user_play], PLAY_IDS[comp_play], self.dice)
+                comp_roll = comp_sheet.roll_chart(PLAY_IDS[comp_play], self.dice)
             else:
-                user_roll = random.choice(list(user_play_outcomes.items()))  #[play, yardage]?
-                comp_roll = random.choice(list(comp_play_outcomes[self.user_team.selected_play].items()))
+                user_roll = user_sheet.roll_chart(PLAY_IDS[user_play], self.dice)  #(roll, yardage)
+                comp_roll = comp_sheet.roll_defense(FORMATION_IDS[comp_play], PLAY_IDS[user_play], self.dice)
         elif self.play_state == "defense":
-            user_roll = random.choice(list(user_play_outcomes[self.comp_team.selected_play].items()))
-            comp_roll = random.choice(list(comp_play_outcomes.items()))
+            user_roll = user_sheet.roll_defense(FORMATION_IDS[user_play], PLAY_IDS[comp_play], self.dice)
+            comp_roll = comp_sheet.roll_chart(PLAY_IDS[comp_play], self.dice)
         elif self.play_state == "Field Goal":
             if self.possession == self.user_team:
-                user_roll = random.choice(list(user_play_outcomes.items()))  #[play, yardage]?
-                comp_roll = [1, 0]
+                user_roll = user_sheet.roll_chart(PLAY_IDS[user_play], self.dice)
+                comp_roll = (1, 0)
             else:
-                comp_roll = random.choice(list(user_play_outcomes.items()))  #[play, yardage]?
-                user_roll = [1, 0]
+                comp_roll = comp_sheet.roll_chart(PLAY_IDS[comp_play], self.dice)
+                user_roll = (1, 0)
         elif self.play_state == "XP":
             if self.possession == self.user_team:
-                user_roll = random.choice(list(user_play_outcomes.items()))
-                comp_roll = [1, 30]     #XP = FG-30yds 
+                user_roll = user_sheet.roll_chart(PLAY_IDS[user_play], self.dice)
+                comp_roll = (1, 30)     #XP = FG-30yds 
             else:
-                comp_roll = random.choice(list(user_play_outcomes.items()))
-                user_roll = [1, 30]     #XP = FG-30yds 
+                comp_roll = comp_sheet.roll_chart(PLAY_IDS[comp_play], self.dice)
+                user_roll = (1, 30)     #XP = FG-30yds 
         else:
-            user_roll = random.choice(list(user_play_outcomes.items()))
-            comp_roll = random.choice(list(comp_play_outcomes.items()))
+            user_roll = user_sheet.roll_chart(PLAY_IDS[user_play], self.dice)
+            comp_roll = comp_sheet.roll_chart(PLAY_IDS[comp_play], self.dice)
 
+        self.rolls = (user_roll, comp_roll)
         user_roll_num = user_roll[0]
         comp_roll_num = comp_roll[0]
         user_result = user_roll[1]
@@ -378,8 +733,17 @@ class Game:
                 result = comp_result - user_result
             result_string = f"XP: Net {result} yards"
         elif self.play_state == "Field Goal":
-            result = user_result - comp_result
+            if self.possession == self.user_team:
+                result = user_result - comp_result
+            else:
+                result = comp_result - user_result
             result_string = f"Field Goal: {result} yards"
+        elif self.play_state == "Punt":
+            if self.possession == self.user_team:
+                result = user_result - comp_result
+            else:
+                result = comp_result - user_result
+            result_string = f"Punt: Net {result} yards"
 
         return result, result_string
 
@@ -388,6 +752,8 @@ class Game:
         """
         _roll is a tuple of (roll, result)
         """
+        if not self.output.enabled:
+            return
         user_dice = user_roll[0]
         comp_dice = comp_roll[0]
         user_result = user_roll[1]
@@ -396,36 +762,15 @@ class Game:
         user_string = f"{self.user_team.name} rolled a {user_dice} for {user_result} yards"
         comp_string = f"{self.comp_team.name} rolled a {comp_dice} for {comp_result} yards"
         if int(user_result) > 0 :
-            user_string = colored(user_string, "green")
+            self.output.write(user_string, "green")
         else:
-            user_string = colored(user_string, "red")
+            self.output.write(user_string, "red")
         if int(comp_result) > 0 :
-            comp_string = colored(comp_string, "green")
+            self.output.write(comp_string, "green")
         else:
-            comp_string = colored(comp_string, "red")
+            self.output.write(comp_string, "red")
     
-        print(user_string)
-        print(comp_string)
-        print(colored(result_string, "yellow", attrs=["blink"]))
-
-
-    def get_play_outcomes(self, player):
-        
-        play_outcomes = ""
-
-        if(player.selected_play in self.KICKOFF_PLAYS):
-            play_outcomes = player.teamsheet.special_teams[player.selected_play]
-        elif(player.selected_play in self.KICKOFF_RETURN_PLAYS):
-            play_outcomes = player.teamsheet.special_teams[player.selected_play]
-        elif(player.selected_play in self.OFFENSE_PLAYS):
-            play_outcomes = player.teamsheet.offense[player.selected_play]
-        elif(player.selected_play in self.DEFENSE_PLAYS):
-            play_outcomes = player.teamsheet.defense[player.selected_play]
-        elif(player.selected_play in self.SP_OFFENSE_PLAYS):
-                play_outcomes = player.teamsheet.special_teams[player.selected_play]
-
-
-        return play_outcomes
+        self.output.write(result_string, "yellow", attrs=["blink"])
 
 
     def post_play_phase(self, result):
@@ -445,11 +790,14 @@ class Game:
         """
         #TODO what about Special teams plays?
 
+        play_state = self.state.play_state
         self.update_ball_position(result)
 
         if self.play_state == "Field Goal":
             #Check if field goal is good, update score
             self.handle_fieldgoal(result)
+        elif self.play_state == "Punt":
+            self.handle_punt()
         elif self.play_state == "XP":
             self.check_XP(result)
             self.swap_possession()
@@ -458,44 +806,129 @@ class Game:
         elif self.play_state == "2pt Attempt":
             self.check_attempt(result)
             self.swap_possession()
-            self.update_game_direction()
             self.setup_kickoff()
         elif self.play_state == "kickoff":
-            self.down = 1
-            self.set_distance()
             self.update_game_clock(10)
             self.update_game_direction()
             self.transition_from_kickoff()
-            if self.check_for_touchback():
-                return
+            self.receive_kick()
         elif self.check_for_touchdown():
             #Display TD, Update game clock only 10 seconds, Update score 
-            self.display_touchdown()
             self.update_game_clock(10)
-            self.update_game_score(6)
-            if self.direction == "left":
-                self.ball_position = -48
-            else:
-                self.ball_position = 48
-            self.down = 0
-            self.distance = 0
-            self.play_state = "post_touchdown"
+            self.score_touchdown()
+        elif self.check_for_safety():
+            self.handle_safety()
         elif self.check_for_firstdown(result):
             self.down = 1
             self.set_distance()
             self.update_game_clock(40)
         elif self.check_for_turnover_on_downs():
-            self.down = 1
-            self.set_distance()
             self.swap_possession()
             self.update_game_direction()
+            self.down = 1
+            self.set_distance()
             self.update_game_clock(10)
         else:
             self.down = self.down + 1
             self.distance = self.distance - result
             self.update_game_clock(40)
         
-        #TODO handle end of game/quarter
+        self.check_end_of_quarter()
+
+        if self.log is not None:
+            self.log.record(self, play_state, result)
+        self.publish()
+
+    @property
+    def play_state(self):
+        return PLAY_STATES[self.state.play_state]
+
+    @play_state.setter
+    def play_state(self, play_state):
+        self.state.play_state = PLAY_STATE_IDS[play_state]
+
+    @property
+    def possession(self):
+        if not self.user_team:
+            return False
+        return self.user_team if self.state.possession == USER else self.comp_team
+
+    @possession.setter
+    def possession(self, team):
+        self.state.possession = COMP if team and team is self.comp_team else USER
+
+    @property
+    def direction(self):
+        return "right" if self.state.direction > 0 else "left"
+
+    @direction.setter
+    def direction(self, direction):
+        self.state.direction = 1 if direction == "right" else -1
+
+    def set_state(self, state):
+        """
+        Carry on from state, e.g. a checkpoint made with state.pack() and
+        GameState.unpack() or a state.copy() taken for a look-ahead
+        """
+        self.state = state
+        if self.user_team:
+            self.user_team.state = state
+            self.comp_team.state = state
+
+    def snapshot(self):
+        """
+        Immutable copy of what is needed to draw the game
+        """
+        return GameSnapshot(
+            ball_position=self.ball_position, down=self.down, distance=self.distance,
+            quarter=self.quarter, seconds=self.seconds, direction=self.direction,
+            play_state=self.play_state, game_over=self.game_over, win_probability=self.win_probability,
+            user_on_offense=self.user_on_offense,
+            user_team=TeamSnapshot(name=self.user_team.name, score=self.user_team.score, timeouts=self.user_team.timeouts),
+            comp_team=TeamSnapshot(name=self.comp_team.name, score=self.comp_team.score, timeouts=self.comp_team.timeouts),
+            offense_plays=self.offense_plays, defense_plays=self.defense_plays)
+
+    def publish(self):
+        if self.snapshots is not None:
+            self.snapshots.publish(self.snapshot())
+
+    def score_touchdown(self):
+        self.display_touchdown()
+        self.update_game_score(6)
+        if self.direction == "left":
+            self.ball_position = -48
+        else:
+            self.ball_position = 48
+        self.down = 0
+        self.distance = 0
+        self.play_state = "post_touchdown"
+
+    def receive_kick(self):
+        """
+        Receiving team takes over after a kickoff or punt, direction is
+        already the receiving team's
+        """
+        self.check_for_touchback()
+        if self.check_for_touchdown():
+            #Returned all the way
+            self.score_touchdown()
+        else:
+            self.down = 1
+            self.set_distance()
+
+    def handle_punt(self):
+        self.update_game_clock(10)
+        self.swap_possession()
+        self.update_game_direction()
+        self.receive_kick()
+
+    def handle_safety(self):
+        #Defense scores 2 and the team that gave up the safety kicks off
+        self.update_game_clock(10)
+        self.swap_possession()
+        self.output.write(f'Safety {self.possession.name}!!!!!', "cyan")
+        self.update_game_score(2)
+        self.setup_kickoff()
 
     def handle_fieldgoal(self, result):
 
@@ -509,12 +942,12 @@ class Game:
         else:
             score_message = f'Field Goal is NO good {self.possession.name}!!!'
             self.update_ball_position(result * -1) #We need to move the ball back to where the kick happened 
-            self.down = 1
-            self.set_distance()
             self.update_game_direction()
             self.swap_possession()
+            self.down = 1
+            self.set_distance()
 
-        print(colored(score_message, "cyan"))
+        self.output.write(score_message, "cyan")
 
 
     def set_distance(self):
@@ -539,7 +972,7 @@ class Game:
         else:
             score_message = f'2pt attempt is no good {self.possession.name}!!!!!'
             
-        print(colored(score_message, "cyan"))
+        self.output.write(score_message, "cyan")
 
 
     def check_XP(self, result):
@@ -549,7 +982,7 @@ class Game:
         else:
             score_message = f'XP is no good {self.possession.name}!!!!!'
             
-        print(colored(score_message, "cyan"))
+        self.output.write(score_message, "cyan")
 
 
 
@@ -576,7 +1009,91 @@ class Game:
             self.play_state = "offense"
     
     def update_game_clock(self, time_elapsed):
-        self.seconds = self.seconds - time_elapsed
+        self.seconds = max(0, self.seconds - time_elapsed)
+
+    def check_end_of_quarter(self):
+        """
+        Once the clock has run out, and no conversion is left to play, start
+        the next quarter or end the game. Teams change ends between quarters
+        and the team that received the opening kickoff kicks off the second
+        half with both teams' timeouts reset. There is no overtime
+        """
+        if self.seconds > 0 or self.play_state == "post_touchdown":
+            return
+
+        if self.quarter == Game.QUARTERS:
+            self.game_over = True
+            self.output.write(f"FINAL: {self.user_team.name}: {self.user_team.score} - "
+                              f"{self.comp_team.name}: {self.comp_team.score}", "cyan", attrs=["bold"])
+            return
+
+        self.quarter = self.quarter + 1
+        self.seconds = Game.QUARTER_SECONDS
+        if self.quarter == Game.QUARTERS // 2 + 1:
+            self.output.write("Halftime", "cyan")
+            self.user_team.timeouts = 3
+            self.comp_team.timeouts = 3
+            #The user received the opening kickoff, so the computer receives
+            #this one and the user kicks it going right
+            self.possession = self.comp_team
+            self.direction = "right"
+            self.setup_kickoff()
+        else:
+            self.output.write(f"End of quarter {self.quarter - 1}", "cyan")
+            self.ball_position = -self.ball_position
+            self.update_game_direction()
+
+    @property
+    def seconds_left(self):
+        """
+        Seconds left in the game
+        """
+        return self.seconds + (Game.QUARTERS - self.quarter) * Game.QUARTER_SECONDS
+
+    @property
+    def half_seconds_left(self):
+        """
+        Seconds left in the half
+        """
+        half_quarters = Game.QUARTERS // 2
+        return self.seconds + (half_quarters - 1 - (self.quarter - 1) % half_quarters) * Game.QUARTER_SECONDS
+
+    def fast_forward(self, until="game", user_caller=None, comp_caller=None):
+        """
+        Play on with no output, snapshots or rendering until the end of the
+        current quarter, the half or the game, then publish once. until is
+        "quarter", "half" or "game". Both teams call plays with
+        RandomPlayCaller unless a caller is given, their own callers are put
+        back afterwards. A log still records every snap.
+
+        Returns a GameSummary
+        """
+        if until not in ("quarter", "half", "game"):
+            raise ValueError(f"Can't fast forward to the end of the {until}")
+        half_quarters = Game.QUARTERS // 2
+        stop_quarter = {"quarter": self.quarter,
+                        "half": (self.quarter - 1) // half_quarters * half_quarters + half_quarters,
+                        "game": Game.QUARTERS}[until]
+
+        output, snapshots = self.output, self.snapshots
+        callers = self.user_team.play_caller, self.comp_team.play_caller
+        start_score = self.user_team.score, self.comp_team.score
+        self.output, self.snapshots = NullOutput(), None
+        self.user_team.play_caller = user_caller or RandomPlayCaller()
+        self.comp_team.play_caller = comp_caller or RandomPlayCaller()
+        plays = 0
+        try:
+            while not self.game_over and self.quarter <= stop_quarter:
+                self.pre_play_phase()
+                self.post_play_phase(self.evaluate_play_phase())
+                plays += 1
+        finally:
+            self.output, self.snapshots = output, snapshots
+            self.user_team.play_caller, self.comp_team.play_caller = callers
+        self.publish()
+
+        return GameSummary(self.state.copy(), plays, self.user_team.score - start_score[0],
+                           self.comp_team.score - start_score[1], self.game_over)
     
     def update_game_score(self, points):
         self.possession.score = self.possession.score + points
@@ -588,18 +1105,31 @@ class Game:
             self.ball_position = self.ball_position - result
 
     def check_for_touchdown(self):
-        if self.ball_position <= -50 or self.ball_position >= 50:
+        #Ball is past the goal line the offense is moving toward
+        if self.direction == "right" and self.ball_position >= 50:
+            return True
+        elif self.direction == "left" and self.ball_position <= -50:
             return True
         else:
             return False
 
-    def check_for_touchback(self):
-        if self.ball_position <= -50 and self.direction == "left":
+    def check_for_safety(self):
+        #Ball is behind the offense's own goal line
+        if self.direction == "right" and self.ball_position <= -50:
             return True
+        elif self.direction == "left" and self.ball_position >= 50:
+            return True
+        else:
+            return False
+
+    def check_for_touchback(self):
+        #Kick ended in the receiving team's end zone, ball comes out to their 25
+        if self.ball_position <= -50 and self.direction == "right":
             self.ball_position = -25
-        elif self.ball_position >= 50 and self.direction == "right":
             return True
+        elif self.ball_position >= 50 and self.direction == "left":
             self.ball_position = 25
+            return True
         else:
             return False
 
@@ -612,23 +1142,30 @@ class Game:
     def check_for_turnover_on_downs(self):
         #We already know it wasnt a 1st down
         if self.down == 4:
-            print(colored("Turnover on Downs", "yellow", attrs=["blink"]))
+            self.output.write("Turnover on Downs", "yellow", attrs=["blink"])
             return True
         else:
             return False
     
     def display_touchdown(self):
         touchdown_message = f'Touchdown {self.possession.name}!!!!!'
-        print(colored(touchdown_message, "cyan"))
+        self.output.write(touchdown_message, "cyan")
 
     def print_game_state(self):
+        if not self.output.enabled:
+            return
+        style = self.output.style
         if self.possession == self.user_team:
-            print(f'SCORE:    {colored(self.user_team.name, "red", attrs=["bold"])}: {self.user_team.score} - {self.comp_team.name}: {self.comp_team.score}')
+            self.output.write(f'SCORE:    {style(self.user_team.name, "red", attrs=["bold"])}: {self.user_team.score} - {self.comp_team.name}: {self.comp_team.score}')
         else:
-            print(f'SCORE:    {self.user_team.name}: {self.user_team.score} - {colored(self.comp_team.name, "red", attrs=["bold"])}: {self.comp_team.score}')
-        print(f"Timeouts  {colored(self.user_team.name, attrs=['bold'])}: {self.user_team.timeouts}   {self.comp_team.name}: {self.comp_team.timeouts}")
-        print(f"Time Remaining: {self.seconds // 60}:{self.seconds % 60}")
-        print(f"{self.down} and {self.distance} on the {self.convert_yardage()} ")
+            self.output.write(f'SCORE:    {self.user_team.name}: {self.user_team.score} - {style(self.comp_team.name, "red", attrs=["bold"])}: {self.comp_team.score}')
+        self.output.write(f"Timeouts  {style(self.user_team.name, attrs=['bold'])}: {self.user_team.timeouts}   {self.comp_team.name}: {self.comp_team.timeouts}")
+        self.output.write(f"Time Remaining: {self.seconds // 60}:{self.seconds % 60}")
+        self.output.write(f"{self.down} and {self.distance} on the {self.convert_yardage()} ")
+        win_probability = self.win_probability
+        if win_probability is not None:
+            self.output.write(f"Win Probability  {self.user_team.name}: {win_probability:.0%}   "
+                              f"{self.comp_team.name}: {1 - win_probability:.0%}")
 
     def convert_yardage(self):
         if self.ball_position <= 0:
@@ -636,6 +1173,37 @@ class Game:
         else:
             return 50 - self.ball_position
 
+    @property
+    def win_probability(self):
+        """
+        The user team's chance of winning from here, None without a win_table
+        """
+        if self.win_table is None:
+            return None
+        return self.win_table.win_probability(self)
+
+    @property
+    def user_on_offense(self):
+        return self.possession == self.user_team
+
+    @property
+    def offense_plays(self):
+        """
+        Playsheet panel rows for the user's offense with the exact expected
+        yards against the computer's defense
+        """
+        from analytics import matchup
+        return matchup(self.user_team.teamsheet, self.comp_team.teamsheet).offense_plays
+
+    @property
+    def defense_plays(self):
+        """
+        Playsheet panel rows for the user's defense with the exact expected
+        yards allowed against the computer's offense
+        """
+        from analytics import matchup
+        return matchup(self.comp_team.teamsheet, self.user_team.teamsheet).defense_plays
+
 
 
 
@@ -645,33 +1213,47 @@ def main():
     #team = Team("atlanta_falcons")
     #teamsheet = Playsheet("/home/nickflo/newpaydirt/playsheets/atlanta_falcons.yaml") 
     #print(teamsheet.special_teams)
-
-    game = Game()
-    game.start_phase("atlanta_falcons", "dallas_cowboys")
-
-    # Initialize pygame and create screen
-    WIDTH  = 800
-    HEIGHT = 600
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Paydirt Football")
-    
-    # Create field visualization
-    field = FootballField(screen, WIDTH, HEIGHT)
-
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return
-
-        game.pre_play_phase()
-        result = game.evaluate_play_phase()
-        game.post_play_phase(result)
-        
-        # Update the visual display
-        field.draw(game)
-        pygame.time.wait(100)  # Small delay to make the game playable
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Paydirt Football")
+    parser.add_argument("--fps", type=int, default=60, help="Frame rate cap")
+    parser.add_argument("--skip-animations", action="store_true", help="Move the ball straight to its new spot")
+    parser.add_argument("--watch", action="store_true", help="Watch the computer play itself instead of playing")
+    parser.add_argument("--speed", type=float, default=0, help="Plays per second when watching, 0 runs flat out")
+    parser.add_argument("--search", type=float, metavar="SECONDS",
+                        help="Computer searches each play call for this long instead of calling at random")
+    parser.add_argument("--metrics", help="Write phase and frame timings here, Prometheus text for .prom and JSON otherwise")
+    parser.add_argument("--metrics-interval", type=float, default=10, help="Seconds between metrics dumps")
+    parser.add_argument("--win-probability", action="store_true",
+                        help="Show the live win probability, the matchup's table is built on first use")
+    args = parser.parse_args()
+
+    import runtime
+    win_table = None
+    if args.win_probability:
+        from winprob import matchup_table
+        win_table = matchup_table("atlanta_falcons", "dallas_cowboys")
+    comp_caller = None
+    if args.search:
+        from search import SearchPlayCaller
+        comp_caller = SearchPlayCaller(args.search)
+    metrics = dump = None
+    if args.metrics:
+        from metrics import Metrics, PeriodicDump
+        metrics = Metrics()
+        dump = PeriodicDump(metrics, args.metrics, args.metrics_interval)
+    try:
+        if args.watch:
+            runtime.watch("atlanta_falcons", "dallas_cowboys", 800, 600, args.fps, args.skip_animations, args.speed,
+                          away_caller=comp_caller, metrics=metrics, win_table=win_table)
+        else:
+            #Plays are called by clicking the playsheet panel or typing them in the terminal
+            asyncio.run(runtime.run("atlanta_falcons", "dallas_cowboys", 800, 600, args.fps, args.skip_animations,
+                                    metrics, comp_caller, win_table))
+    finally:
+        if dump is not None:
+            dump.stop()
 
 if __name__ == "__main__":
     main()
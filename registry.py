@@ -0,0 +1,163 @@
+import json
+import os
+from collections import OrderedDict, namedtuple
+
+
+#Playsheet directories, os.pathsep separated, searched in order
+ROOTS_VARIABLE = "PAYDIRT_PLAYSHEETS"
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playsheets")
+
+INDEX_FILE = "teams.pdx"
+INDEX_VERSION = 1
+
+TeamEntry = namedtuple("TeamEntry", ["team", "name", "path", "content_hash", "cache_path", "mtime_ns", "size"])
+TeamEntry.__doc__ = """
+One indexed playsheet
+
+    team:           Team id, the yaml file name without .yaml
+    name:           Display name from team_info
+    path:           Absolute path of the yaml file
+    content_hash:   sha256 of the yaml file
+    cache_path:     Where its compiled .pdc cache lives
+    mtime_ns, size: os.stat of the yaml file when it was indexed
+"""
+
+
+def default_roots():
+    """
+    Directories in $PAYDIRT_PLAYSHEETS, or the playsheets directory next to this file
+    """
+    roots = os.environ.get(ROOTS_VARIABLE)
+    if roots:
+        return [os.path.abspath(root) for root in roots.split(os.pathsep) if root]
+    return [DEFAULT_ROOT]
+
+
+class TeamRegistry:
+    """
+    Index of every playsheet under a set of directory roots
+
+    The index holds a TeamEntry per yaml file and is saved as teams.pdx in
+    each root, so a library of hundreds of playsheets is listed without
+    reading any of them. Files are only re-read when their size or mtime
+    changes. A team found in more than one root comes from the first.
+
+    Playsheet bodies are built with loader(entry) on first use and kept in
+    least recently used order. Once their nbytes total passes memory_cap the
+    oldest are dropped, and are loaded again from their .pdc cache if asked
+    for. Games holding an evicted playsheet keep using it. Playsheets given
+    to pin, such as the shared ones of sharedsheets, are never evicted.
+
+    Attributes:
+        roots:      Playsheet directories, default_roots() when not given
+        loader:     Callable building a playsheet from a TeamEntry. It is
+                    also used to index new files and must give the result
+                    team_info, content_hash, cache_path and nbytes
+        memory_cap: Bytes of loaded playsheets to keep, None for no cap
+    """
+
+    def __init__(self, loader, roots=None, memory_cap=64 << 20):
+        self.loader = loader
+        self.memory_cap = memory_cap
+        self.set_roots(roots)
+
+    def set_roots(self, roots):
+        """
+        Switch to new directory roots, None for default_roots(). The index is rebuilt on next use
+        """
+        self.roots = [os.path.abspath(root) for root in roots] if roots is not None else None
+        self.entries = None
+        self.loaded = OrderedDict()
+        self.loaded_bytes = 0
+        self.pinned = {}
+
+    def index(self):
+        """
+        {team: TeamEntry} of every playsheet, built on first use
+        """
+        if self.entries is None:
+            if self.roots is None:
+                self.roots = default_roots()
+            self.entries = {}
+            for root in self.roots:
+                for team, entry in self.index_root(root).items():
+                    self.entries.setdefault(team, entry)
+        return self.entries
+
+    def index_root(self, root):
+        index_path = os.path.join(root, INDEX_FILE)
+        try:
+            with open(index_path) as f:
+                saved = json.load(f)
+            known = {entry[0]: TeamEntry(*entry) for entry in saved["teams"]} if saved["version"] == INDEX_VERSION else {}
+        except (OSError, ValueError, KeyError, TypeError):
+            known = {}
+
+        entries = {}
+        try:
+            files = sorted((entry for entry in os.scandir(root) if entry.name.endswith(".yaml") and entry.is_file()),
+                           key=lambda entry: entry.name)
+        except OSError:
+            return entries
+        for file in files:
+            team = file.name[:-len(".yaml")]
+            stat = file.stat()
+            entry = known.get(team)
+            if entry is None or entry.path != file.path or (entry.mtime_ns, entry.size) != (stat.st_mtime_ns, stat.st_size):
+                #New or changed, read it once to index it
+                entry = TeamEntry(team, None, file.path, None, None, stat.st_mtime_ns, stat.st_size)
+                playsheet = self.loader(entry)
+                entry = entry._replace(name=playsheet.team_info["name"], content_hash=playsheet.content_hash,
+                                       cache_path=playsheet.cache_path)
+            entries[team] = entry
+
+        if entries != known:
+            #Write then rename, a read-only root just isn't indexed on disk
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump({"version": INDEX_VERSION, "teams": list(entries.values())}, f, indent=1)
+                os.replace(tmp_path, index_path)
+            except OSError:
+                pass
+        return entries
+
+    def teams(self):
+        """
+        Sorted team ids
+        """
+        return sorted(self.index())
+
+    def entry(self, team):
+        try:
+            return self.index()[team]
+        except KeyError:
+            raise KeyError(f"No playsheet for {team} in {os.pathsep.join(self.roots)}") from None
+
+    def load(self, team):
+        """
+        Shared playsheet for team, loaded on first use
+        """
+        playsheet = self.pinned.get(team)
+        if playsheet is not None:
+            return playsheet
+        playsheet = self.loaded.get(team)
+        if playsheet is not None:
+            self.loaded.move_to_end(team)
+            return playsheet
+
+        playsheet = self.loader(self.entry(team))
+        self.loaded[team] = playsheet
+        self.loaded_bytes += playsheet.nbytes
+        while self.memory_cap is not None and self.loaded_bytes > self.memory_cap and len(self.loaded) > 1:
+            _, evicted = self.loaded.popitem(last=False)
+            self.loaded_bytes -= evicted.nbytes
+        return playsheet
+
+    def pin(self, team, playsheet):
+        """
+        Serve playsheet for team from now on, outside the memory cap
+        """
+        self.pinned[team] = playsheet
+        if team in self.loaded:
+            self.loaded_bytes -= self.loaded.pop(team).nbytes
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import struct
+from collections import namedtuple
+
+from pd import Game, Playsheet, NullOutput, PlayCaller, CHART_PLAYS, DEFENSE_PLAYS
+from state import GameState, PLAY_STATES
+
+
+#Every play a team can end up with as its selected_play, stored by index
+LOG_PLAYS = CHART_PLAYS + DEFENSE_PLAYS
+LOG_PLAY_IDS = {play: index for index, play in enumerate(LOG_PLAYS)}
+UNKNOWN_PLAY = 255
+
+MAGIC = b"PDLOG001"
+VERSION = 1
+#magic, version, snap record size, seed, has seed, home and away playsheet
+#sha256, home and away name lengths. The two names follow as utf-8
+HEADER = struct.Struct("<8sHHQ?32s32sHH")
+#play_state, user play, comp play, user roll, comp roll, user yards, comp yards,
+#net result, then the packed GameState after the snap
+SNAP = struct.Struct(f"<BBBbbhhh{GameState.RECORD.size}s")
+
+Snap = namedtuple("Snap", ["play_state", "user_play", "comp_play", "user_roll", "comp_roll",
+                           "user_yards", "comp_yards", "result", "state"])
+Snap.__doc__ = """
+One snap of a logged game
+
+    play_state:             Game.play_state the snap was played in
+    user_play, comp_play:   Plays each team rolled
+    user_roll, comp_roll:   Dice rolls, kicks not rolled by a team log a fixed roll as Game does
+    user_yards, comp_yards: Chart yards of each roll
+    result:                 Net yards returned by evaluate_play_phase
+    state:                  GameState after post_play_phase
+"""
+
+LogHeader = namedtuple("LogHeader", ["home", "away", "seed", "home_hash", "away_hash"])
+
+
+class GameLog:
+    """
+    Append-only binary play-by-play log of one game
+
+    Attach it as game.log after start_phase and Game appends a fixed width
+    SNAP record at the end of every post_play_phase.
+    """
+
+    def __init__(self, path, game, seed=None):
+        self.file = open(path, "wb")
+        home = game.user_team.name.encode()
+        away = game.comp_team.name.encode()
+        self.file.write(HEADER.pack(MAGIC, VERSION, SNAP.size, seed or 0, seed is not None,
+                                    bytes.fromhex(game.user_team.teamsheet.content_hash),
+                                    bytes.fromhex(game.comp_team.teamsheet.content_hash),
+                                    len(home), len(away)))
+        self.file.write(home + away)
+
+    def record(self, game, play_state, result):
+        (user_roll, user_yards), (comp_roll, comp_yards) = game.rolls
+        self.file.write(SNAP.pack(play_state,
+                                  LOG_PLAY_IDS.get(game.user_team.selected_play, UNKNOWN_PLAY),
+                                  LOG_PLAY_IDS.get(game.comp_team.selected_play, UNKNOWN_PLAY),
+                                  user_roll, comp_roll, user_yards, comp_yards, result,
+                                  game.state.pack()))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayLog:
+    """
+    Read a GameLog without re-simulating anything
+
+    Snaps are fixed width, so log[n] seeks straight to snap n and iterating
+    decodes the whole log in one read. A partly written last snap, from a
+    game that was cut off, is ignored.
+
+    Attributes:
+        header: LogHeader of the game
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        (magic, version, snap_size, seed, has_seed, home_hash, away_hash,
+         home_length, away_length) = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or snap_size != SNAP.size:
+            raise ValueError(f"{path} is not a version {VERSION} game log")
+        names = self.file.read(home_length + away_length).decode()
+        self.header = LogHeader(names[:home_length], names[home_length:], seed if has_seed else None,
+                                home_hash.hex(), away_hash.hex())
+        self.start = self.file.tell()
+        self.snaps = (os.fstat(self.file.fileno()).st_size - self.start) // SNAP.size
+
+    def __len__(self):
+        return self.snaps
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += self.snaps
+        if not 0 <= n < self.snaps:
+            raise IndexError(f"snap {n} is not in a log of {self.snaps} snaps")
+        self.file.seek(self.start + n * SNAP.size)
+        return ReplayLog.decode(SNAP.unpack(self.file.read(SNAP.size)))
+
+    def __iter__(self):
+        self.file.seek(self.start)
+        data = self.file.read(self.snaps * SNAP.size)
+        return map(ReplayLog.decode, SNAP.iter_unpack(data))
+
+    @staticmethod
+    def decode(fields):
+        play_state, user_play, comp_play, user_roll, comp_roll, user_yards, comp_yards, result, state = fields
+        return Snap(PLAY_STATES[play_state], ReplayLog.play_name(user_play), ReplayLog.play_name(comp_play),
+                    user_roll, comp_roll, user_yards, comp_yards, result, GameState.unpack(state))
+
+    @staticmethod
+    def play_name(play_id):
+        return LOG_PLAYS[play_id] if play_id < len(LOG_PLAYS) else None
+
+    def changed_playsheets(self):
+        """
+        Teams whose playsheet on disk differs from the one the game was played with
+        """
+        return [team for team, content_hash in ((self.header.home, self.header.home_hash),
+                                                (self.header.away, self.header.away_hash))
+                if Playsheet.load(team).content_hash != content_hash]
+
+    def game(self, n=None):
+        """
+        Game set to the state after snap n, the start of the game when n is None.
+        It can be drawn or inspected but not played on, the dice are not logged
+        """
+        game = Game(output=NullOutput())
+        game.start_phase(self.header.home, self.header.away, PlayCaller(), PlayCaller())
+        if n is not None:
+            game.set_state(self[n].state)
+        return game
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def watch(log, start=0, width=800, height=600, fps=60, skip_animations=False):
+    """
+    Play a log back through FootballField from snap start until the window is closed
+    """
+    import pygame
+    from gui import FootballField
+
+    game = log.game(start - 1 if start > 0 else None)
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption(f"Replay {log.header.home} vs {log.header.away}")
+    field = FootballField(screen, width, height, fps, skip_animations)
+
+    snaps = (log[n] for n in range(start, len(log)))
+    try:
+        while True:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                return
+            #Next snap once the ball has stopped
+            if not field.animating:
+                snap = next(snaps, None)
+                if snap is not None:
+                    game.set_state(snap.state)
+            field.draw(game.snapshot())
+            field.tick()
+    finally:
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read back a game log written by sim.py --log-dir")
+    parser.add_argument("log", help="Game log file")
+    parser.add_argument("-p", "--play", type=int, help="Only show the snap with this index")
+    parser.add_argument("--watch", action="store_true", help="Replay the game on the field, from --play if given")
+    parser.add_argument("--fps", type=int, default=60, help="Frame rate cap when watching")
+    parser.add_argument("--skip-animations", action="store_true", help="Move the ball straight to its new spot")
+    args = parser.parse_args()
+
+    with ReplayLog(args.log) as log:
+        header = log.header
+        print(f"{header.home} vs {header.away}, seed {header.seed}, {len(log)} snaps")
+        for team in log.changed_playsheets():
+            print(f"Warning: the {team} playsheet has changed since this game was played")
+
+        if args.watch:
+            watch(log, args.play or 0, fps=args.fps, skip_animations=args.skip_animations)
+            return
+
+        snaps = [(args.play, log[args.play])] if args.play is not None else enumerate(log)
+        for n, snap in snaps:
+            state = snap.state
+            print(f"[{n}] {snap.play_state}: {snap.user_play} ({snap.user_roll}: {snap.user_yards}) vs "
+                  f"{snap.comp_play} ({snap.comp_roll}: {snap.comp_yards}) net {snap.result} -> "
+                  f"ball {state.ball_position} down {state.down} distance {state.distance} "
+                  f"clock Q{state.quarter} {state.seconds} score {state.score[0]}-{state.score[1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import stat
+import sys
+import threading
+import time
+
+import pygame
+
+from pd import Game, PlayCaller, NullOutput, RandomPlayCaller
+from gui import FootballField, SIM_REST
+from snapshot import SnapshotBuffer
+
+
+class UserPlayCaller(PlayCaller):
+    """
+    Human play caller for the asyncio runtime
+
+    Plays are submitted by clicks on the playsheet panel or lines typed on
+    stdin, and handed to whichever call is waiting for one. Submitting
+    SIM_REST answers the call with a random play and asks for the rest of
+    the game to be fast-forwarded.
+
+    Attributes:
+        choices:    Plays the waiting call accepts, None when nothing is waiting
+        sim_rest:   Set once SIM_REST has been submitted
+    """
+
+    def __init__(self):
+        self.choices = None
+        self.sim_rest = False
+        self.submitted = asyncio.Queue()
+
+    def submit(self, choice):
+        """
+        Offer a play name or a number from the printed list, ignored when
+        no call is waiting
+        """
+        if self.choices is not None:
+            self.submitted.put_nowait(choice)
+
+    def parse(self, choice, plays):
+        choice = choice.strip()
+        if choice.isdigit():
+            index = int(choice)
+            return plays[index] if 0 <= index < len(plays) else None
+        for play in plays:
+            if play.lower() == choice.lower():
+                return play
+        return None
+
+    async def select_play_async(self, game, team, plays):
+        play_choices = ""
+        for index, play in enumerate(plays):
+            play_choices = play_choices + f"[{index}]: {play}\n"
+        game.output.write(play_choices)
+
+        #Anything submitted while the last play ran was meant for an earlier call
+        while not self.submitted.empty():
+            self.submitted.get_nowait()
+
+        self.choices = plays
+        try:
+            while True:
+                choice = await self.submitted.get()
+                if choice.strip().lower() == SIM_REST.lower():
+                    self.sim_rest = True
+                    return RandomPlayCaller().select_play(game, team, plays)
+                play = self.parse(choice, plays)
+                if play is not None:
+                    return play
+                game.output.write("Enter a valid number")
+        finally:
+            self.choices = None
+
+
+class Renderer:
+    """
+    Draws the latest published GameSnapshot at a fixed frame rate as its
+    own task and turns pygame events into play submissions
+
+    Attributes:
+        frame:  Set after every frame is drawn
+    """
+
+    def __init__(self, field, snapshots, user, fps=60):
+        self.field = field
+        self.snapshots = snapshots
+        self.user = user
+        self.fps = fps
+        self.frame = asyncio.Event()
+
+    async def next_frame(self):
+        self.frame.clear()
+        await self.frame.wait()
+
+    async def settled(self):
+        """
+        Wait until the last play is on screen and the ball has stopped
+        """
+        await self.next_frame()
+        while self.field.animating:
+            await self.next_frame()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        frame_seconds = 1 / self.fps
+        last_frame = loop.time()
+
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    play = self.field.play_at(event.pos)
+                    if play is not None:
+                        self.user.submit(play)
+
+            #The game task runs while this one sleeps, so a submitted play
+            #is resolved before the next frame is drawn
+            now = loop.time()
+            self.field.animate_ball_movement(now - last_frame)
+            last_frame = now
+            self.field.choices = self.user.choices
+            _, snapshot = self.snapshots.latest()
+            self.field.draw(snapshot)
+            self.frame.set()
+
+            await asyncio.sleep(max(0.0, last_frame + frame_seconds - loop.time()))
+
+
+async def read_stdin(user):
+    """
+    Submit every line typed on stdin to the user's play caller
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+    try:
+        #Only terminals, pipes and sockets can be watched by the event loop
+        if not (sys.stdin.isatty() or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)):
+            raise ValueError("stdin can't be read asynchronously")
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except (ValueError, OSError, NotImplementedError):
+        #Files, /dev/null and platforms without pipe support are read on a daemon thread
+        def read_lines():
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(user.submit, line)
+        threading.Thread(target=read_lines, daemon=True).start()
+        return
+
+    try:
+        while line := await reader.readline():
+            user.submit(line.decode())
+    finally:
+        #connect_read_pipe leaves stdin non-blocking, which the shell would inherit
+        os.set_blocking(sys.stdin.fileno(), True)
+
+
+async def play_game(game, renderer):
+    """
+    Advance the game one play at a time as the play calls come in
+    """
+    user = game.user_team.play_caller
+    while not game.game_over:
+        await game.pre_play_phase_async()
+        result = game.evaluate_play_phase()
+        game.post_play_phase(result)
+        if user.sim_rest and not game.game_over:
+            summary = game.fast_forward("game")
+            game.output.write(f"Simulated the last {summary.plays} plays")
+        await renderer.settled()
+
+
+async def run(user_team, comp_team, width=800, height=600, fps=60, skip_animations=False, metrics=None,
+              comp_caller=None, win_table=None):
+    """
+    Run a game against the computer in a pygame window until it is closed.
+    With a metrics.Metrics the game phases and frames are timed; the wait for
+    the user's play call is not part of any phase. The computer calls its
+    plays with comp_caller, RandomPlayCaller by default. With a
+    winprob.WinTable the scoreboard shows the user's win probability
+    """
+    user = UserPlayCaller()
+    game = Game()
+    game.snapshots = SnapshotBuffer()
+    game.win_table = win_table
+    game.start_phase(user_team, comp_team, user, comp_caller)
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Paydirt Football")
+    field = FootballField(screen, width, height, fps, skip_animations)
+    if metrics is not None:
+        metrics.instrument_game(game)
+        metrics.instrument_field(field)
+    renderer = Renderer(field, game.snapshots, user, fps)
+
+    tasks = [asyncio.create_task(renderer.run()),
+             asyncio.create_task(play_game(game, renderer)),
+             asyncio.create_task(read_stdin(user))]
+    try:
+        #Ends when the window is closed, or with the error of a failed task
+        done, _ = await asyncio.wait(tasks[:2], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+        if not tasks[0].done():
+            #Game over, the final score stays up until the window is closed
+            await tasks[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        pygame.quit()
+
+
+def simulate(game, plays_per_second=None, stop=None):
+    """
+    Play a computer vs computer game to the end, publishing to game.snapshots.
+    Runs flat out unless plays_per_second is given
+    """
+    while not game.game_over and not (stop and stop.is_set()):
+        game.pre_play_phase()
+        result = game.evaluate_play_phase()
+        game.post_play_phase(result)
+        if plays_per_second:
+            time.sleep(1 / plays_per_second)
+
+
+def watch(home, away, width=800, height=600, fps=60, skip_animations=False, plays_per_second=None,
+          home_caller=None, away_caller=None, seed=None, metrics=None, win_table=None):
+    """
+    Watch a computer vs computer game. The game runs on its own thread and
+    the window draws whatever snapshot is newest each frame until it is
+    closed. With a metrics.Metrics the game phases and frames are timed, with
+    a winprob.WinTable the scoreboard shows the home win probability
+    """
+    game = Game(output=NullOutput(), seed=seed)
+    game.snapshots = SnapshotBuffer()
+    game.win_table = win_table
+    game.start_phase(home, away, home_caller or RandomPlayCaller(), away_caller or RandomPlayCaller())
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Paydirt Football")
+    field = FootballField(screen, width, height, fps, skip_animations)
+    if metrics is not None:
+        metrics.instrument_game(game)
+        metrics.instrument_field(field)
+
+    stop = threading.Event()
+    simulation = threading.Thread(target=simulate, args=(game, plays_per_second, stop), daemon=True)
+    simulation.start()
+    try:
+        while True:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                return
+            _, snapshot = game.snapshots.latest()
+            field.draw(snapshot)
+            field.tick()
+    finally:
+        stop.set()
+        simulation.join()
+        pygame.quit()
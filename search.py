@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from dice import RandomDice
+from pd import Game, PlayCaller, RandomPlayCaller, NullOutput
+from sim import simulate_game
+from state import GameState, PLAY_STATE_IDS
+
+
+SearchStats = namedtuple("SearchStats", ["play", "rollouts", "seconds", "plays"])
+SearchStats.__doc__ = """
+Search behind one play call
+
+    play:       Play that was called
+    rollouts:   Games played out for the call
+    seconds:    Wall time the call took
+    plays:      {play: (rollouts, mean value)} of every candidate, value is
+                1 for a win, 0.5 for a tie and 0 for a loss
+"""
+
+
+def snap_state(game):
+    """
+    (state, made) to roll out the call being asked for. state is a copy from
+    before this snap's play calls started, made is the [(side, play)] calls
+    already made this snap, in order
+    """
+    state = game.state.copy()
+    made = []
+    if game.play_state == "2pt Attempt":
+        #play_calls has already switched from post_touchdown, and the team
+        #with the ball has already called its 2pt Attempt
+        state.play_state = PLAY_STATE_IDS["post_touchdown"]
+        made.append((game.possession.side, "2pt Attempt"))
+    return state, made
+
+
+class Rollouts:
+    """
+    Plays games out from a state with the call being searched forced
+
+    One headless Game is reused for every rollout. It has its own dice and
+    rng, so searching never touches the dice of the game being played.
+    Both teams call the rest of the game with rollout_caller.
+    """
+
+    def __init__(self, home, away, seed=None, rollout_caller=None):
+        self.rng = random.Random(seed)
+        self.game = Game(output=NullOutput(), dice=RandomDice(self.rng))
+        self.game.rng = self.rng
+        self.caller = rollout_caller or RandomPlayCaller()
+        self.game.start_phase(home, away, self.caller, self.caller)
+
+    def play(self, state, side, made, play):
+        """
+        Value of play for side, 1 win, 0.5 tie and 0 loss. The calls in made
+        are replayed first, whichever team made them, so the rollout reaches
+        the same call that is being searched
+        """
+        game = self.game
+        game.set_state(state.copy())
+        answers = list(made) + [(side, play)]
+        asked = 0
+        calls = game.play_calls()
+        try:
+            team, plays = next(calls)
+            while True:
+                if asked < len(answers) and team.side == answers[asked][0]:
+                    choice = answers[asked][1]
+                    asked += 1
+                else:
+                    choice = self.caller.select_play(game, team, plays)
+                team, plays = calls.send(choice)
+        except StopIteration:
+            pass
+
+        game.post_play_phase(game.evaluate_play_phase())
+        while not game.game_over:
+            game.pre_play_phase()
+            game.post_play_phase(game.evaluate_play_phase())
+
+        margin = game.state.score[side] - game.state.score[1 - side]
+        return 1.0 if margin > 0 else 0.5 if margin == 0 else 0.0
+
+
+def search(home, away, packed, side, made, plays, budget, max_rollouts, seed, exploration=1.4):
+    """
+    UCB1 over plays, each pull a full rollout, until budget seconds pass or
+    max_rollouts are played. Returns {play: (rollouts, total value)}.
+    Module level so it can run in a worker process
+    """
+    state = GameState.unpack(packed)
+    rollouts = Rollouts(home, away, seed)
+    totals = {play: [0, 0.0] for play in plays}
+    deadline = time.perf_counter() + budget if budget is not None else None
+    n = 0
+    while (max_rollouts is None or n < max_rollouts) and (deadline is None or time.perf_counter() < deadline):
+        if n < len(plays):
+            play = plays[n]
+        else:
+            log_n = math.log(n)
+            play = max(plays, key=lambda p: totals[p][1] / totals[p][0] +
+                       exploration * math.sqrt(log_n / totals[p][0]))
+        totals[play][0] += 1
+        totals[play][1] += rollouts.play(state, side, made, play)
+        n += 1
+    return {play: tuple(total) for play, total in totals.items()}
+
+
+class SearchPlayCaller(PlayCaller):
+    """
+    Computer play caller that searches each call with Monte Carlo rollouts
+
+    Every candidate play is tried by copying the GameState from before the
+    snap, forcing the candidate, and playing the game out with random play
+    calls on dice of its own. Candidates are chosen UCB1 style, so the
+    promising ones get most of the rollouts, and the play with the most
+    rollouts is called. Calls with a single option aren't searched.
+
+    A call searches for budget seconds, and/or until max_rollouts. With a
+    pool (a concurrent.futures executor, a ProcessPoolExecutor to use more
+    cores) every worker runs its own search over the same call and their
+    statistics are added up. In the asyncio runtime the search runs on a
+    thread so the window keeps drawing.
+
+    Attributes:
+        budget:         Seconds per call, None for no time limit
+        max_rollouts:   Rollouts per call and per worker, None for no limit
+        pool:           Executor for parallel searches, or None
+        workers:        Searches run at once on the pool
+        stats:          SearchStats of every call made so far
+    """
+
+    def __init__(self, budget=0.05, max_rollouts=None, pool=None, workers=1, seed=None):
+        if budget is None and max_rollouts is None:
+            raise ValueError("SearchPlayCaller needs a budget or max_rollouts")
+        self.budget = budget
+        self.max_rollouts = max_rollouts
+        self.pool = pool
+        self.workers = workers if pool is not None else 1
+        self.rng = random.Random(seed)
+        self.stats = []
+
+    @property
+    def last(self):
+        return self.stats[-1] if self.stats else None
+
+    def select_play(self, game, team, plays):
+        if len(plays) == 1:
+            return plays[0]
+
+        start = time.perf_counter()
+        state, made = snap_state(game)
+
+        args = (game.user_team.name, game.comp_team.name, state.pack(), team.side, made, list(plays),
+                self.budget, self.max_rollouts)
+        seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+        if self.pool is None:
+            results = [search(*args, seeds[0])]
+        else:
+            results = [future.result() for future in [self.pool.submit(search, *args, seed) for seed in seeds]]
+
+        totals = {play: [0, 0.0] for play in plays}
+        for result in results:
+            for play, (rollouts, value) in result.items():
+                totals[play][0] += rollouts
+                totals[play][1] += value
+        play = max(plays, key=lambda p: (totals[p][0], totals[p][1]))
+        self.stats.append(SearchStats(play, sum(rollouts for rollouts, _ in totals.values()),
+                                      time.perf_counter() - start,
+                                      {p: (rollouts, value / rollouts if rollouts else 0.0)
+                                       for p, (rollouts, value) in totals.items()}))
+        return play
+
+    async def select_play_async(self, game, team, plays):
+        #Search on a thread so the window keeps drawing while it runs
+        return await asyncio.get_running_loop().run_in_executor(None, self.select_play, game, team, plays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the search play caller against the random computer")
+    parser.add_argument("home", help="Home team playsheet name, searched, e.g. atlanta_falcons")
+    parser.add_argument("away", help="Away team playsheet name, random, e.g. dallas_cowboys")
+    parser.add_argument("-n", "--games", type=int, default=1, help="Number of games to simulate")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("-b", "--budget", type=float, default=0.05, help="Seconds of search per play call")
+    parser.add_argument("--rollouts", type=int, help="Rollouts per play call and worker")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes searching each call")
+    args = parser.parse_args()
+
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    try:
+        wins = 0
+        for seed in range(args.seed, args.seed + args.games):
+            caller = SearchPlayCaller(args.budget or None, args.rollouts, pool, args.workers, seed)
+            result = simulate_game(args.home, args.away, seed, home_caller=caller)
+            wins += result.home_score > result.away_score
+            rollouts = sum(stats.rollouts for stats in caller.stats)
+            print(f"[{result.seed}] {result.home}: {result.home_score} - {result.away}: {result.away_score} "
+                  f"({len(caller.stats)} searched calls, {rollouts / max(len(caller.stats), 1):.0f} rollouts each)")
+        print(f"{args.home} won {wins} of {args.games}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import itertools
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from pd import list_playsheets
+from registry import ROOTS_VARIABLE
+from sharedsheets import SharedPlaysheets, attach
+from sim import simulate_game
+
+
+ScheduledGame = namedtuple("ScheduledGame", ["home", "away", "seed"])
+Standing = namedtuple("Standing", ["team", "wins", "losses", "ties", "points_for", "points_against"])
+
+
+def game_seed(season_seed, home, away, game_index):
+    """
+    Seed for one scheduled game. It only depends on the season seed and the
+    game's place in the schedule, so any game can be replayed on its own with
+    simulate_game(home, away, game_seed(...))
+    """
+    digest = hashlib.sha256(f"{season_seed}:{home}:{away}:{game_index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def schedule(teams, games_per_pairing, season_seed=0):
+    """
+    Round robin with every team hosting every other team games_per_pairing times
+    """
+    return [ScheduledGame(home, away, game_seed(season_seed, home, away, index))
+            for home, away in itertools.permutations(teams, 2)
+            for index in range(games_per_pairing)]
+
+
+def play_games(games, log_dir=None, export_dir=None, export_format="auto"):
+    """
+    Worker task, returns (home_score, away_score) for each ScheduledGame
+
+    With export_dir the task exports its snaps to its own files, named
+    after the seed of its first game
+    """
+    exporter = None
+    if export_dir is not None and games:
+        from export import SnapExporter
+        exporter = SnapExporter(export_dir, f"season-{games[0].seed:016x}", format=export_format)
+
+    results = []
+    try:
+        for game in games:
+            result = simulate_game(game.home, game.away, game.seed, log_dir=log_dir, exporter=exporter)
+            results.append((result.home_score, result.away_score))
+    finally:
+        if exporter is not None:
+            exporter.close()
+    return results
+
+
+def run_season(teams=None, games_per_pairing=1, season_seed=0, workers=None, chunk_size=64, log_dir=None,
+               export_dir=None, export_format="auto"):
+    """
+    Play the full schedule across a process pool
+
+    Games are sent to the workers in chunks of chunk_size so each task is
+    long enough to hide the pool overhead. The workers read every team's
+    charts from one sharedsheets.SharedPlaysheets. With log_dir every game
+    writes a replay log there, and with export_dir every snap is exported
+    there as columnar data. Returns a list of (ScheduledGame, home_score,
+    away_score) in schedule order
+    """
+    if teams is None:
+        teams = list_playsheets()
+    games = schedule(teams, games_per_pairing, season_seed)
+    chunks = [games[i:i + chunk_size] for i in range(0, len(games), chunk_size)]
+    task = partial(play_games, log_dir=log_dir, export_dir=export_dir, export_format=export_format)
+
+    if workers == 1:
+        chunk_results = list(map(task, chunks))
+    else:
+        #Workers read every playsheet from one shared block instead of loading their own
+        with SharedPlaysheets.create(teams) as shared, \
+             ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(shared,)) as pool:
+            chunk_results = list(pool.map(task, chunks))
+
+    return [(game, *scores) for game, scores in zip(games, itertools.chain.from_iterable(chunk_results))]
+
+
+def standings(results):
+    """
+    Standing per team sorted by wins then point differential
+    """
+    table = {}
+    for game, home_score, away_score in results:
+        for team, scored, allowed in ((game.home, home_score, away_score), (game.away, away_score, home_score)):
+            wins, losses, ties, points_for, points_against = table.get(team, (0, 0, 0, 0, 0))
+            table[team] = (wins + (scored > allowed), losses + (scored < allowed), ties + (scored == allowed),
+                           points_for + scored, points_against + allowed)
+
+    rows = [Standing(team, *record) for team, record in table.items()]
+    return sorted(rows, key=lambda row: (row.wins + row.ties / 2, row.points_for - row.points_against), reverse=True)
+
+
+def head_to_head(results):
+    """
+    {(team, opponent): (wins, losses, ties, point differential)} over every
+    game the two teams played, home or away
+    """
+    table = {}
+    for game, home_score, away_score in results:
+        for team, opponent, scored, allowed in ((game.home, game.away, home_score, away_score),
+                                                (game.away, game.home, away_score, home_score)):
+            wins, losses, ties, differential = table.get((team, opponent), (0, 0, 0, 0))
+            table[(team, opponent)] = (wins + (scored > allowed), losses + (scored < allowed),
+                                       ties + (scored == allowed), differential + scored - allowed)
+    return table
+
+
+def print_season(results):
+    print(f"{'Team':<24}{'W':>6}{'L':>6}{'T':>6}{'PF':>8}{'PA':>8}{'DIFF':>8}")
+    for row in standings(results):
+        print(f"{row.team:<24}{row.wins:>6}{row.losses:>6}{row.ties:>6}"
+              f"{row.points_for:>8}{row.points_against:>8}{row.points_for - row.points_against:>+8}")
+
+    print("\nHead to head (W-L-T, DIFF)")
+    for (team, opponent), (wins, losses, ties, differential) in sorted(head_to_head(results).items()):
+        print(f"{team:<24} vs {opponent:<24} {wins}-{losses}-{ties} {differential:+d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round robin season over every playsheet")
+    parser.add_argument("-m", "--games", type=int, default=1, help="Games per home/away pairing")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Season seed")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Games per worker task")
+    parser.add_argument("--playsheets", action="append",
+                        help="Playsheet directory, may be repeated. Defaults to $PAYDIRT_PLAYSHEETS or ./playsheets")
+    parser.add_argument("--log-dir", help="Write a replay log of every game to this directory")
+    parser.add_argument("--export-dir", help="Export every snap as columnar data to this directory")
+    parser.add_argument("--export-format", default="auto", choices=["auto", "parquet", "arrow", "npy"],
+                        help="Columnar format, auto is parquet with pyarrow installed and npy without")
+    parser.add_argument("teams", nargs="*", help="Teams to schedule, defaults to every playsheet")
+    args = parser.parse_args()
+
+    if args.playsheets:
+        #Through the environment so pool workers index the same directories
+        os.environ[ROOTS_VARIABLE] = os.pathsep.join(args.playsheets)
+
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+    results = run_season(args.teams or None, args.games, args.seed, args.workers, args.chunk_size, args.log_dir,
+                         args.export_dir, args.export_format)
+    print_season(results)
+
+if __name__ == "__main__":
+    main()
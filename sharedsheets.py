@@ -0,0 +1,126 @@
+import mmap
+import os
+import tempfile
+
+from pd import TEAMS, Playsheet, CHART_PLAYS, OFFENSE_PLAYS, DEFENSE_PLAYS
+from dice import CHART_ROLLS, DEFENSE_ROLLS
+
+
+#int16 cells per team, every compiled playsheet is the same size
+CHART_CELLS = len(CHART_PLAYS) * len(CHART_ROLLS)
+DEFENSE_CELLS = len(DEFENSE_PLAYS) * len(OFFENSE_PLAYS) * len(DEFENSE_ROLLS)
+TEAM_BYTES = 2 * (CHART_CELLS + DEFENSE_CELLS)
+
+
+class SharedPlaysheets:
+    """
+    Compiled charts of many playsheets in one read-only memory-mapped block
+
+    The parent process writes every team's chart and defense_chart, in
+    native byte order, to one file, in /dev/shm when there is one. It hands
+    the SharedPlaysheets itself to its workers, which pickles to just the
+    path and the small per-team metadata. attach() maps the file and pins a
+    Playsheet per team in TEAMS whose tables are views straight into the
+    mapping. Every worker shares the same pages, so adding workers adds no
+    playsheet memory and no playsheet loading.
+
+    Attributes:
+        path:           File holding the block
+        teams:          Team ids in block order
+        team_info:      team_info of each team
+        content_hashes: Playsheet content_hash of each team
+    """
+
+    def __init__(self, path, teams, team_info, content_hashes):
+        self.path = path
+        self.teams = teams
+        self.team_info = team_info
+        self.content_hashes = content_hashes
+        self.offsets = {team: index * TEAM_BYTES for index, team in enumerate(teams)}
+        self.block = None
+        self.owner = False
+
+    @classmethod
+    def create(cls, teams, directory=None):
+        """
+        Write the block for teams, loading them through TEAMS
+        """
+        if directory is None and os.path.isdir("/dev/shm"):
+            directory = "/dev/shm"
+        sheets = [Playsheet.load(team) for team in teams]
+        fd, path = tempfile.mkstemp(prefix="paydirt-", suffix=".pdc", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            for sheet in sheets:
+                f.write(sheet.chart)
+                f.write(sheet.defense_chart)
+        shared = cls(path, list(teams), [sheet.team_info for sheet in sheets],
+                     [sheet.content_hash for sheet in sheets])
+        shared.owner = True
+        return shared
+
+    def __getstate__(self):
+        return {"path": self.path, "teams": self.teams, "team_info": self.team_info,
+                "content_hashes": self.content_hashes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def map(self):
+        if self.block is None:
+            with open(self.path, "rb") as f:
+                self.block = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.block
+
+    def tables(self, team):
+        """
+        (chart, defense_chart) of team as int16 memoryviews of the mapping
+        """
+        offset = self.offsets[team]
+        view = memoryview(self.map())
+        chart = view[offset:offset + 2 * CHART_CELLS].cast("h")
+        defense_chart = view[offset + 2 * CHART_CELLS:offset + TEAM_BYTES].cast("h")
+        return chart, defense_chart
+
+    def arrays(self, team):
+        """
+        (chart, defense_chart) of team as read-only numpy views of the mapping,
+        shaped like vector.VectorGames' tables
+        """
+        import numpy as np
+
+        chart, defense_chart = self.tables(team)
+        return (np.frombuffer(chart, dtype=np.int16).reshape(len(CHART_PLAYS), len(CHART_ROLLS)),
+                np.frombuffer(defense_chart, dtype=np.int16).reshape(len(DEFENSE_PLAYS), len(OFFENSE_PLAYS),
+                                                                     len(DEFENSE_ROLLS)))
+
+    def attach(self, registry=TEAMS):
+        """
+        Pin a Playsheet of every team in registry that reads from the block
+        """
+        for team, team_info, content_hash in zip(self.teams, self.team_info, self.content_hashes):
+            registry.pin(team, Playsheet.from_tables(team_info, content_hash, *self.tables(team)))
+
+    def close(self):
+        """
+        Drop the block. Only the process that created it removes the file,
+        existing mappings stay readable
+        """
+        if self.owner:
+            self.owner = False
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach(shared):
+    """
+    ProcessPoolExecutor initializer
+    """
+    shared.attach()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import os
+from collections import namedtuple
+
+from dice import make_dice
+from pd import Game, NullOutput, RandomPlayCaller
+from registry import ROOTS_VARIABLE
+
+
+GameResult = namedtuple("GameResult", ["home", "away", "home_score", "away_score", "plays", "seed"])
+GameResult.__doc__ = """
+Final result of a headless game
+
+    home, away:             Team names, home is the user_team slot
+    home_score, away_score: Final scores
+    plays:                  Number of snaps played
+    seed:                   Seed that reproduces the game
+"""
+
+
+def log_path(log_dir, home, away, seed):
+    if seed is None:
+        #Unseeded games are all different, so each gets the first free number
+        for number in itertools.count():
+            path = os.path.join(log_dir, f"{home}-{away}-unseeded-{number}.pdlog")
+            if not os.path.exists(path):
+                return path
+    return os.path.join(log_dir, f"{home}-{away}-{seed}.pdlog")
+
+
+class Recorders:
+    """
+    Game.log that passes every snap on to several logs
+    """
+
+    def __init__(self, recorders):
+        self.recorders = recorders
+
+    def record(self, game, play_state, result):
+        for recorder in self.recorders:
+            recorder.record(game, play_state, result)
+
+    def close(self):
+        for recorder in self.recorders:
+            recorder.close()
+
+
+def simulate_game(home, away, seed=None, home_caller=None, away_caller=None, log_dir=None, exporter=None,
+                  metrics=None):
+    """
+    Run a full game with no console input or output
+
+    Both sides call plays with RandomPlayCaller unless a PlayCaller is given.
+    The same seed and callers always produce the same game. With log_dir the
+    play-by-play is written to a replay.GameLog at log_path(...), and with
+    an export.SnapExporter every snap is exported as a row of game seed, or
+    of the exporter's running game number when there is no seed.
+    A metrics.Metrics times every phase of the game and counts its events.
+    """
+
+    game = Game(output=NullOutput(), seed=seed, dice=make_dice(seed, buffered=True))
+    game.start_phase(home, away, home_caller or RandomPlayCaller(), away_caller or RandomPlayCaller())
+    if metrics is not None:
+        metrics.instrument_game(game)
+    recorders = []
+    if log_dir is not None:
+        from replay import GameLog
+        recorders.append(GameLog(log_path(log_dir, home, away, seed), game, seed))
+    if exporter is not None:
+        recorders.append(exporter.recorder(game, seed))
+    if recorders:
+        game.log = recorders[0] if len(recorders) == 1 else Recorders(recorders)
+
+    plays = 0
+    while not game.game_over:
+        game.pre_play_phase()
+        result = game.evaluate_play_phase()
+        game.post_play_phase(result)
+        plays += 1
+
+    if game.log is not None:
+        game.log.close()
+
+    return GameResult(home, away, game.user_team.score, game.comp_team.score, plays, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Paydirt games without the GUI")
+    parser.add_argument("home", help="Home team playsheet name, e.g. atlanta_falcons")
+    parser.add_argument("away", help="Away team playsheet name, e.g. dallas_cowboys")
+    parser.add_argument("-n", "--games", type=int, default=1, help="Number of games to simulate")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--playsheets", action="append",
+                        help="Playsheet directory, may be repeated. Defaults to $PAYDIRT_PLAYSHEETS or ./playsheets")
+    parser.add_argument("--log-dir", help="Write a replay log of every game to this directory")
+    parser.add_argument("--export-dir", help="Export every snap as columnar data to this directory")
+    parser.add_argument("--export-format", default="auto", choices=["auto", "parquet", "arrow", "npy"],
+                        help="Columnar format, auto is parquet with pyarrow installed and npy without")
+    parser.add_argument("--metrics", help="Write phase timings and event counts here, Prometheus text for .prom and JSON otherwise")
+    parser.add_argument("--metrics-interval", type=float, default=10, help="Seconds between metrics dumps")
+    args = parser.parse_args()
+
+    if args.playsheets:
+        #Through the environment so pool workers index the same directories
+        os.environ[ROOTS_VARIABLE] = os.pathsep.join(args.playsheets)
+
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+    exporter = None
+    if args.export_dir:
+        from export import SnapExporter
+        exporter = SnapExporter(args.export_dir, format=args.export_format)
+    metrics = dump = None
+    if args.metrics:
+        from metrics import Metrics, PeriodicDump
+        metrics = Metrics()
+        dump = PeriodicDump(metrics, args.metrics, args.metrics_interval)
+
+    for seed in range(args.seed, args.seed + args.games):
+        result = simulate_game(args.home, args.away, seed, log_dir=args.log_dir, exporter=exporter, metrics=metrics)
+        print(f"[{result.seed}] {result.home}: {result.home_score} - {result.away}: {result.away_score} ({result.plays} plays)")
+
+    if exporter is not None:
+        exporter.close()
+    if dump is not None:
+        dump.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import threading
+
+
+class Snapshot:
+    """
+    Immutable record, every slot is set once by the constructor
+    """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class TeamSnapshot(Snapshot):
+    __slots__ = ("name", "score", "timeouts")
+
+
+class GameSnapshot(Snapshot):
+    """
+    Everything FootballField draws, copied out of a Game between plays so it
+    can be drawn on another thread while the game carries on
+
+    Attributes:
+        ball_position, down, distance, quarter, seconds, direction, play_state, game_over: Game state
+        win_probability:    Chance the user's team wins, None when not shown
+        user_on_offense:    True when the user's team has the ball
+        user_team:          TeamSnapshot of the user's team
+        comp_team:          TeamSnapshot of the computer's team
+        offense_plays:      Read only playsheet panel rows for the user's offense
+        defense_plays:      Read only playsheet panel rows for the user's defense
+    """
+    __slots__ = ("ball_position", "down", "distance", "quarter", "seconds", "direction", "play_state",
+                 "game_over", "win_probability", "user_on_offense", "user_team", "comp_team", "offense_plays", "defense_plays")
+
+    def convert_yardage(self):
+        if self.ball_position <= 0:
+            return self.ball_position + 50
+        else:
+            return 50 - self.ball_position
+
+
+class SnapshotBuffer:
+    """
+    Double buffer handing GameSnapshots from the thread playing a game to
+    the one drawing it
+
+    publish fills the back slot and flips it to the front in one step, so a
+    reader always gets a whole snapshot. Readers only ever see the newest
+    one; snapshots published between two reads are dropped.
+
+    Attributes:
+        version:    Number of snapshots published so far
+    """
+
+    def __init__(self):
+        self.slots = [None, None]
+        self.front = 0
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def publish(self, snapshot):
+        with self.changed:
+            back = 1 - self.front
+            self.slots[back] = snapshot
+            self.front = back
+            self.version += 1
+            self.changed.notify_all()
+
+    def latest(self):
+        """
+        (version, snapshot) of the newest snapshot, snapshot is None before the first publish
+        """
+        with self.changed:
+            return self.version, self.slots[self.front]
+
+    def wait(self, version, timeout=None):
+        """
+        Block until a snapshot newer than version is published, returns latest()
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.version > version, timeout)
+            return self.version, self.slots[self.front]
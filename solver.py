@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+
+import numpy as np
+
+import analytics
+from dice import OFFENSE_DICE, SPECIAL_TEAMS_DICE
+from pd import (Game, Playsheet, PlayCaller, OFFENSE_PLAYS, DEFENSE_PLAYS,
+                PLAY_IDS, CHART_ROLLS)
+
+
+SOLVER_VERSION = 3
+#Next to this file like the playsheets, so it is the same from any working directory
+POLICY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies")
+
+#Offense actions in the policy tables
+ACTIONS = OFFENSE_PLAYS + ["Field Goal", "Punt"]
+
+#State grid: clock in 10 second units, down 1-4, distance 1-MAX_DISTANCE and
+#yard line y -49..49 measured in the offense's direction (y = ball_position
+#when moving right, -ball_position when moving left)
+MAX_DISTANCE = 20
+DOWNS = 5
+DISTANCES = MAX_DISTANCE + 1
+YARDS = 99
+CELLS = DOWNS * DISTANCES * YARDS
+
+
+def chart_pmf(sheet, play):
+    """
+    {yards: probability} of one offense or special teams chart row
+    """
+    rolls = len(CHART_ROLLS)
+    play_id = PLAY_IDS[play]
+    dice = OFFENSE_DICE if play_id < len(OFFENSE_PLAYS) else SPECIAL_TEAMS_DICE
+    pmf = {}
+    for yards, p in zip(sheet.chart[play_id * rolls:(play_id + 1) * rolls], dice.probabilities):
+        pmf[yards] = pmf.get(yards, 0.0) + p
+    return pmf
+
+def difference_pmf(kick, kick_return):
+    """
+    {net: probability} of a kick less its return
+    """
+    pmf = {}
+    for kick_yards, kick_p in kick.items():
+        for return_yards, return_p in kick_return.items():
+            net = kick_yards - return_yards
+            pmf[net] = pmf.get(net, 0.0) + kick_p * return_p
+    return pmf
+
+def scrimmage_pmf(offense_sheet, defense_sheet, play):
+    """
+    {net: probability} of an offense play against a random formation
+    """
+    cells = analytics.matchup(offense_sheet, defense_sheet).cells[play]
+    pmf = {}
+    for cell in cells.values():
+        for i, p in enumerate(cell.pmf):
+            if p:
+                pmf[cell.low + i] = pmf.get(cell.low + i, 0.0) + p / len(cells)
+    return pmf
+
+
+def first_down_distance(y):
+    #Same as Game.set_distance, first and goal inside the 10
+    return np.where(y >= 40, 50 - y, 10)
+
+def cell_index(down, distance, y):
+    return (down * DISTANCES + distance) * YARDS + y + 49
+
+
+class Transitions:
+    """
+    Every offense action of one team as a gather into a source vector
+
+    The source vector at clock t is
+        [V_offense[t-4] cells, -V_defense[t-1] cells, TD, safety, FG good, return TD]
+    so Q[action] = (weights * source[index]).sum(1) over every scrimmage cell.
+    """
+
+    OWN = 0
+    OPPONENT = CELLS
+    TOUCHDOWN = 2 * CELLS
+    SAFETY = TOUCHDOWN + 1
+    FIELD_GOAL_GOOD = TOUCHDOWN + 2
+    RETURN_TOUCHDOWN = TOUCHDOWN + 3
+
+    def __init__(self, offense_sheet, defense_sheet):
+        down, distance, y = np.meshgrid(np.arange(1, DOWNS), np.arange(1, DISTANCES), np.arange(-49, 50), indexing="ij")
+        self.down = down.reshape(-1, 1)
+        self.distance = distance.reshape(-1, 1)
+        self.y = y.reshape(-1, 1)
+        self.cells = cell_index(self.down, self.distance, self.y).ravel()
+
+        self.actions = []
+        for play in OFFENSE_PLAYS:
+            self.actions.append(self.scrimmage(scrimmage_pmf(offense_sheet, defense_sheet, play)))
+        self.actions.append(self.field_goal(chart_pmf(offense_sheet, "Field Goal")))
+        self.actions.append(self.punt(difference_pmf(chart_pmf(offense_sheet, "Punt"),
+                                                     chart_pmf(defense_sheet, "Punt Return"))))
+
+    @staticmethod
+    def split(pmf):
+        yards = np.array(sorted(pmf)).reshape(1, -1)
+        weights = np.array([pmf[n] for n in yards[0]], dtype=np.float32).reshape(1, -1)
+        return yards, weights
+
+    def scrimmage(self, pmf):
+        n, weights = Transitions.split(pmf)
+        y = self.y + n
+        inside = np.clip(y, -49, 49)
+        new_distance = np.clip(self.distance - n, 1, MAX_DISTANCE)
+        index = np.select(
+            [y >= 50, y <= -50, n >= self.distance, self.down == 4],
+            [Transitions.TOUCHDOWN, Transitions.SAFETY,
+             Transitions.OWN + cell_index(1, first_down_distance(inside), inside),
+             Transitions.OPPONENT + cell_index(1, first_down_distance(-inside), -inside)],
+            Transitions.OWN + cell_index(np.minimum(self.down + 1, 4), new_distance, inside))
+        return index, np.broadcast_to(weights, index.shape)
+
+    def field_goal(self, pmf):
+        #Missed kicks go back to the spot of the kick
+        kick, weights = Transitions.split(pmf)
+        miss = Transitions.OPPONENT + cell_index(1, first_down_distance(-self.y), -self.y)
+        index = np.where(self.y + kick > 50, Transitions.FIELD_GOAL_GOOD, miss)
+        return index, np.broadcast_to(weights, index.shape)
+
+    def punt(self, pmf):
+        net, weights = Transitions.split(pmf)
+        received = -(self.y + net)
+        received = np.where(received <= -50, -25, received)   #touchback
+        inside = np.clip(received, -49, 49)
+        index = np.where(received >= 50, Transitions.RETURN_TOUCHDOWN,
+                         Transitions.OPPONENT + cell_index(1, first_down_distance(inside), inside))
+        return index, np.broadcast_to(weights, index.shape)
+
+    def q_values(self, source):
+        return np.stack([(weights * source[index]).sum(1) for index, weights in self.actions])
+
+
+class MarginPolicy:
+    """
+    Margin-maximizing play calling for one matchup, indexed by side (0 home,
+    1 away). The state has no score, so it plays the same whether it is
+    ahead or behind and is not the policy that wins the most games
+
+    Attributes:
+        offense:    offense[side][t, down, distance, y + 49] is an ACTIONS index
+        defense:    defense[side][t, down, distance, y + 49] is a DEFENSE_PLAYS
+                    index against the other side's solved play
+        value:      value[side][t, down, distance, y + 49] is the expected
+                    point margin for the side with the ball
+        conversion: "XP" or "2pt Attempt" per side
+        two_point_play, two_point_formation: Calls on a 2pt attempt per side
+    """
+
+    def __init__(self, offense, defense, value, conversion, two_point_play, two_point_formation):
+        self.offense = offense
+        self.defense = defense
+        self.value = value
+        self.conversion = conversion
+        self.two_point_play = two_point_play
+        self.two_point_formation = two_point_formation
+
+    def save(self, path):
+        np.savez_compressed(path, offense=self.offense, defense=self.defense, value=self.value,
+                            conversion=self.conversion, two_point_play=self.two_point_play,
+                            two_point_formation=self.two_point_formation)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["offense"], data["defense"], data["value"], list(data["conversion"]),
+                       list(data["two_point_play"]), list(data["two_point_formation"]))
+
+
+GAME_SECONDS = Game.QUARTERS * Game.QUARTER_SECONDS
+
+
+def clock_after(t, units, quarter_units):
+    """
+    (units left, halftime) after a play taking units from t units left in
+    the game. The clock stops at the end of a quarter, and halftime is True
+    when the play ends the first half
+    """
+    quarter_end = (t - 1) // quarter_units * quarter_units
+    halftime = quarter_end == Game.QUARTERS // 2 * quarter_units and t - units <= quarter_end
+    return max(t - units, quarter_end), halftime
+
+
+def solve(home_sheet, away_sheet, seconds=GAME_SECONDS):
+    """
+    MarginPolicy by backward induction over the clock for both teams at once
+
+    Every clock event in Game is a multiple of 10 seconds, so the clock is
+    counted in 10 second units and each state only depends on states with
+    less time left. seconds is the time left in the game. Each team
+    maximizes its expected point margin for the rest of the game against a
+    defense calling random formations. Plays stop at the end of a quarter
+    like Game's clock, and a play that ends the first half is followed by
+    the second half kickoff, the home team kicking, whatever the state.
+    """
+    sheets = [home_sheet, away_sheet]
+    units = seconds // 10
+    quarter_units = Game.QUARTER_SECONDS // 10
+    half_units = Game.QUARTERS // 2 * quarter_units
+    transitions = [Transitions(sheets[side], sheets[1 - side]) for side in (0, 1)]
+
+    value = np.zeros((2, units + 1, DOWNS, DISTANCES, YARDS), dtype=np.float32)
+    offense = np.zeros((2, units + 1, DOWNS, DISTANCES, YARDS), dtype=np.int8)
+    kickoff = np.zeros((2, units + 1), dtype=np.float32)
+    touchdown = np.zeros((2, units + 1), dtype=np.float32)
+
+    #Conversions take no time so the choice is the same at every clock
+    conversion, conversion_points, two_point_play, two_point_formation = [None] * 2, [0.0] * 2, [None] * 2, [None] * 2
+    for side in (0, 1):
+        xp = sum(p for kick, p in chart_pmf(sheets[side], "Field Goal").items() if kick - 30 >= 0)
+        two_point = {play: sum(p for n, p in scrimmage_pmf(sheets[side], sheets[1 - side], play).items() if n >= 2)
+                     for play in OFFENSE_PLAYS}
+        best = max(two_point, key=two_point.get)
+        conversion[side] = "XP" if xp >= 2 * two_point[best] else "2pt Attempt"
+        conversion_points[side] = max(xp, 2 * two_point[best])
+        two_point_play[side] = best
+        #The other side defends the attempt with its stingiest formation
+        cells = analytics.matchup(sheets[side], sheets[1 - side]).cells[best]
+        two_point_formation[1 - side] = min(cells, key=lambda formation: cells[formation].probability_at_least(2))
+
+    #A touchdown as time runs out still gets its conversion
+    touchdown[:, 0] = conversion_points
+
+    #Kickoff net yards, kicking side's kick less the other side's return
+    kick_pmfs = [Transitions.split(difference_pmf(chart_pmf(sheets[side], "Kickoff"),
+                                                  chart_pmf(sheets[1 - side], "Kickoff Return")))
+                 for side in (0, 1)]
+
+    for t in range(1, units + 1):
+        #Plays take 10 seconds, or 40 for a down that keeps the ball
+        t1, halftime1 = clock_after(t, 1, quarter_units)
+        t4, halftime4 = clock_after(t, 4, quarter_units)
+        if halftime1 or halftime4:
+            #Second half kickoff value for each side
+            second_half = [kickoff[0, half_units], -kickoff[0, half_units]]
+
+        for side in (0, 1):
+            #Kicking off at t, the other side receives at t1
+            net, weights = kick_pmfs[side]
+            received = 15 - net
+            received = np.where(received <= -50, -25, received)
+            inside = np.clip(received, -49, 49)
+            if halftime1:
+                outcome = np.where(received >= 50, -(6 + conversion_points[1 - side]), 0) + second_half[side]
+            else:
+                outcome = np.where(received >= 50, -(6 + touchdown[1 - side, t1]),
+                                   -value[1 - side, t1].ravel()[cell_index(1, first_down_distance(inside), inside)])
+            kickoff[side, t] = (weights * outcome).sum()
+            touchdown[side, t] = conversion_points[side] + kickoff[side, t]
+
+        for side in (0, 1):
+            if halftime4:
+                own = np.full(CELLS, second_half[side], dtype=np.float32)
+            else:
+                own = value[side, t4].ravel()
+            if halftime1:
+                after = second_half[side]
+                opponent = np.full(CELLS, after, dtype=np.float32)
+                scores = [6 + conversion_points[side] + after, -2 + after, 3 + after,
+                          -(6 + conversion_points[1 - side]) + after]
+            else:
+                opponent = -value[1 - side, t1].ravel()
+                scores = [6 + touchdown[side, t1], -2 + kickoff[side, t1],
+                          3 + kickoff[side, t1], -(6 + touchdown[1 - side, t1])]
+            source = np.concatenate([own, opponent, scores]).astype(np.float32)
+            q = transitions[side].q_values(source)
+            value[side, t].ravel()[transitions[side].cells] = q.max(0)
+            offense[side, t].ravel()[transitions[side].cells] = q.argmax(0)
+
+    #Defense picks the formation that gives up the fewest expected yards to
+    #the play the other side's policy calls
+    defense = np.zeros_like(offense)
+    for side in (0, 1):
+        cells = analytics.matchup(sheets[1 - side], sheets[side]).cells
+        means = np.zeros((len(ACTIONS), len(DEFENSE_PLAYS)))
+        for play_id, play in enumerate(OFFENSE_PLAYS):
+            means[play_id] = [cells[play][formation].mean for formation in DEFENSE_PLAYS]
+        defense[side] = means.argmin(1)[offense[1 - side]]
+
+    return MarginPolicy(offense, defense, value, conversion, two_point_play, two_point_formation)
+
+
+def policy_path(home_sheet, away_sheet, seconds):
+    return os.path.join(POLICY_DIR, f"{home_sheet.content_hash[:16]}-{away_sheet.content_hash[:16]}"
+                                    f"-{seconds}-v{SOLVER_VERSION}.npz")
+
+_policies = {}
+
+def matchup_policy(home, away, seconds=GAME_SECONDS):
+    """
+    MarginPolicy for home vs away, solved once and persisted in POLICY_DIR
+    """
+    home_sheet = Playsheet.load(home)
+    away_sheet = Playsheet.load(away)
+    path = policy_path(home_sheet, away_sheet, seconds)
+
+    policy = _policies.get(path)
+    if policy is None:
+        if os.path.exists(path):
+            policy = MarginPolicy.load(path)
+        else:
+            policy = solve(home_sheet, away_sheet, seconds)
+            os.makedirs(POLICY_DIR, exist_ok=True)
+            policy.save(path)
+        _policies[path] = policy
+    return policy
+
+
+class SolvedPlayCaller(PlayCaller):
+    """
+    Computer play caller that looks its call up in the MarginPolicy for the
+    game's matchup
+    """
+
+    def __init__(self, seconds=GAME_SECONDS):
+        self.seconds = seconds
+        self.policy = None
+
+    def select_play(self, game, team, plays):
+        if self.policy is None:
+            self.policy = matchup_policy(game.user_team.name, game.comp_team.name, self.seconds)
+        side = 0 if team == game.user_team else 1
+
+        if plays == Game.POST_TD_PLAYS:
+            return self.policy.conversion[side]
+        if game.play_state == "2pt Attempt":
+            if team == game.possession:
+                return self.policy.two_point_play[side]
+            return self.policy.two_point_formation[side]
+        if game.play_state in ("offense", "defense"):
+            #Past a shorter solved horizon the policy for the most time left is used
+            t = min(game.seconds_left // 10, self.policy.offense.shape[1] - 1)
+            direction = 1 if game.direction == "right" else -1
+            cell = (side, t, game.down, min(game.distance, MAX_DISTANCE), game.ball_position * direction + 49)
+            if team == game.possession:
+                return ACTIONS[self.policy.offense[cell]]
+            return DEFENSE_PLAYS[self.policy.defense[cell]]
+
+        #Kickoffs have a single choice
+        return plays[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve margin-maximizing play calling for a matchup")
+    parser.add_argument("home", help="Home team playsheet name, e.g. atlanta_falcons")
+    parser.add_argument("away", help="Away team playsheet name, e.g. dallas_cowboys")
+    args = parser.parse_args()
+
+    policy = matchup_policy(args.home, args.away)
+    for side, team in enumerate((args.home, args.away)):
+        t = policy.offense.shape[1] - 1
+        calls = np.bincount(policy.offense[side, t, 1:, 1:].ravel(), minlength=len(ACTIONS))
+        print(f"{team}: converts with {policy.conversion[side]}, "
+              f"opening 1st and 10 at own 25 worth an expected margin of {policy.value[side, t, 1, 10, -25 + 49]:+.2f} points")
+        print("    " + ", ".join(f"{action} {count}" for action, count in zip(ACTIONS, calls) if count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import struct
+from array import array
+
+
+#play_state values in the order they are stored, False is before the first kickoff
+PLAY_STATES = [False, "kickoff", "offense", "defense", "post_touchdown", "Field Goal", "Punt", "XP", "2pt Attempt"]
+PLAY_STATE_IDS = {play_state: index for index, play_state in enumerate(PLAY_STATES)}
+
+USER = 0
+COMP = 1
+
+#Scoring and change of possession events a snap can produce
+EVENTS = ["none", "touchdown", "field goal", "safety", "extra point", "two point", "turnover on downs"]
+EVENT_IDS = {event: index for index, event in enumerate(EVENTS)}
+
+
+def snap_event(play_state, possession, down, user_points, comp_points, possession_after):
+    """
+    Index into EVENTS of what a snap produced. play_state, possession and
+    down are from before the snap, the points are what each side scored
+    """
+    scored = user_points if possession == USER else comp_points
+    if play_state == "XP" and scored:
+        return EVENT_IDS["extra point"]
+    if play_state == "2pt Attempt" and scored:
+        return EVENT_IDS["two point"]
+    if play_state == "Field Goal" and scored:
+        return EVENT_IDS["field goal"]
+    if user_points == 6 or comp_points == 6:
+        return EVENT_IDS["touchdown"]
+    if user_points == 2 or comp_points == 2:
+        return EVENT_IDS["safety"]
+    if play_state in ("offense", "defense") and down == 4 and possession_after != possession:
+        return EVENT_IDS["turnover on downs"]
+    return EVENT_IDS["none"]
+
+
+class GameState:
+    """
+    Compact game state, everything needed to carry on a game from between
+    two plays
+
+    Strings and Team references are stored as small ints so the whole
+    state packs into a fixed size RECORD.
+
+    Attributes:
+        ball_position, down, distance, quarter, seconds: As on Game
+        play_state: Index into PLAY_STATES
+        possession: USER or COMP
+        direction:  +1 when play moves right, -1 when it moves left
+        score:      array of the USER and COMP scores
+        timeouts:   array of the USER and COMP timeouts left
+        game_over:  True once the game has ended
+    """
+    __slots__ = ("ball_position", "down", "distance", "quarter", "seconds", "play_state",
+                 "possession", "direction", "score", "timeouts", "game_over")
+
+    VERSION = 1
+    #version, ball_position, down, distance, quarter, seconds, play_state, possession,
+    #direction, user score, comp score, user timeouts, comp timeouts, game_over
+    RECORD = struct.Struct("<BhbhBhBBbhhbb?")
+
+    def __init__(self):
+        #Kickoff from the 35 going right
+        self.ball_position = 15
+        self.down = 0
+        self.distance = 0
+        self.quarter = 1
+        self.seconds = 15*60
+        self.play_state = PLAY_STATE_IDS[False]
+        self.possession = USER
+        self.direction = 1
+        self.score = array('h', [0, 0])
+        self.timeouts = array('b', [3, 3])
+        self.game_over = False
+
+    def pack(self):
+        return GameState.RECORD.pack(GameState.VERSION, self.ball_position, self.down, self.distance,
+                                     self.quarter, self.seconds, self.play_state, self.possession,
+                                     self.direction, *self.score, *self.timeouts, self.game_over)
+
+    def load(self, data):
+        """
+        Overwrite this state with a packed RECORD
+        """
+        (version, self.ball_position, self.down, self.distance, self.quarter, self.seconds,
+         self.play_state, self.possession, self.direction, user_score, comp_score,
+         user_timeouts, comp_timeouts, self.game_over) = GameState.RECORD.unpack(data)
+        if version != GameState.VERSION:
+            raise ValueError(f"GameState record version {version}, expected {GameState.VERSION}")
+        self.score[:] = array('h', [user_score, comp_score])
+        self.timeouts[:] = array('b', [user_timeouts, comp_timeouts])
+
+    @classmethod
+    def unpack(cls, data):
+        state = cls()
+        state.load(data)
+        return state
+
+    def copy(self):
+        return GameState.unpack(self.pack())
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self.pack() == other.pack()
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"GameState({values})"
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from dice import (DEFENSE_DICE, OFFENSE_DICE, AliasTable, DiceBuffer, RandomDice, alias_table, make_dice)
+
+
+def roll_counts(dice, roll, model, n):
+    counts = np.zeros(len(model.rolls))
+    for _ in range(n):
+        counts[getattr(dice, roll)()] += 1
+    return counts / n
+
+
+@pytest.mark.parametrize("model", [OFFENSE_DICE, DEFENSE_DICE])
+def test_alias_table_is_exact(model):
+    #Each column keeps prob of itself and gives the rest to its alias
+    table = AliasTable(model)
+    n = len(model.probabilities)
+    implied = table.prob.copy()
+    np.add.at(implied, table.alias, 1 - table.prob)
+    assert np.allclose(implied / n, model.probabilities)
+    assert alias_table(model) is alias_table(model)
+
+
+@pytest.mark.parametrize("roll, model", [("offense_roll", OFFENSE_DICE), ("defense_roll", DEFENSE_DICE)])
+def test_buffered_and_unbuffered_rolls_match_the_model(roll, model):
+    n = 40000
+    buffered = roll_counts(DiceBuffer(0), roll, model, n)
+    unbuffered = roll_counts(RandomDice(random.Random(0)), roll, model, n)
+    #Well within five standard errors of every roll's probability
+    tolerance = 5 * np.sqrt(np.array(model.probabilities) / n) + 1e-9
+    assert np.all(np.abs(buffered - model.probabilities) < tolerance)
+    assert np.all(np.abs(unbuffered - model.probabilities) < tolerance)
+
+
+def test_fixed_seed_repeats():
+    for buffered in (False, True):
+        first, second = make_dice(7, buffered), make_dice(7, buffered)
+        rolls = [(first.offense_roll(), first.defense_roll(), first.special_teams_roll()) for _ in range(1000)]
+        assert rolls == [(second.offense_roll(), second.defense_roll(), second.special_teams_roll())
+                         for _ in range(1000)]
+    assert isinstance(make_dice(7), RandomDice)
+    assert isinstance(make_dice(7, buffered=True), DiceBuffer)
@@ -0,0 +1,24 @@
+import json
+
+import numpy as np
+
+from export import SnapExporter, load_npy
+from sim import simulate_game
+
+
+def test_unseeded_games_export(tmp_path):
+    #Games without a seed are numbered by the exporter
+    with SnapExporter(tmp_path, format="npy", chunk_rows=64) as exporter:
+        first = simulate_game("atlanta_falcons", "dallas_cowboys", exporter=exporter)
+        second = simulate_game("dallas_cowboys", "atlanta_falcons", exporter=exporter)
+
+    rows = load_npy(tmp_path)
+    assert list(np.unique(rows["game"])) == [0, 1]
+    assert (rows["game"] == 0).sum() == first.plays
+    assert (rows["game"] == 1).sum() == second.plays
+    assert list(rows["snap"][rows["game"] == 1]) == list(range(second.plays))
+
+    teams = json.loads((tmp_path / "schema.json").read_text())["teams"]
+    assert teams[rows["home"][0]] == "atlanta_falcons"
+    assert rows["home_points"][rows["game"] == 0].sum() == first.home_score
+    assert rows["away_points"][rows["game"] == 1].sum() == second.away_score
@@ -0,0 +1,66 @@
+import os
+import shutil
+
+from pd import Playsheet, CHART_ROLLS, PLAY_IDS
+from registry import INDEX_FILE, TeamRegistry
+
+PLAYSHEETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playsheets")
+
+
+class CountingLoader:
+    def __init__(self):
+        self.loaded = []
+
+    def __call__(self, entry):
+        self.loaded.append(entry.team)
+        return Playsheet.from_entry(entry)
+
+
+def copy_playsheets(root):
+    for team in ("atlanta_falcons", "dallas_cowboys"):
+        shutil.copy(os.path.join(PLAYSHEETS, f"{team}.yaml"), root)
+
+
+def line_plunge_10(playsheet):
+    return playsheet.chart[PLAY_IDS["Line Plunge"] * len(CHART_ROLLS)]
+
+
+def test_index_is_reused(tmp_path):
+    copy_playsheets(tmp_path)
+    loader = CountingLoader()
+    registry = TeamRegistry(loader, [tmp_path])
+    assert registry.teams() == ["atlanta_falcons", "dallas_cowboys"]
+    assert sorted(loader.loaded) == ["atlanta_falcons", "dallas_cowboys"]
+    assert (tmp_path / INDEX_FILE).exists()
+    assert (tmp_path / "atlanta_falcons.pdc").exists()
+
+    #A fresh registry lists the teams from teams.pdx without reading any yaml
+    loader = CountingLoader()
+    registry = TeamRegistry(loader, [tmp_path])
+    assert registry.entry("atlanta_falcons").name == "Atlanta Falcons"
+    assert loader.loaded == []
+
+
+def test_changed_yaml_is_reindexed(tmp_path):
+    copy_playsheets(tmp_path)
+    before = TeamRegistry(Playsheet.from_entry, [tmp_path])
+    old_entry = before.entry("atlanta_falcons")
+    old_cache = (tmp_path / "atlanta_falcons.pdc").read_bytes()
+    assert line_plunge_10(before.load("atlanta_falcons")) == 1
+
+    path = tmp_path / "atlanta_falcons.yaml"
+    text = path.read_text()
+    path.write_text(text.replace('"Line Plunge":\n    10: 1\n', '"Line Plunge":\n    10: 9\n', 1))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, old_entry.mtime_ns + 1_000_000_000))
+
+    loader = CountingLoader()
+    after = TeamRegistry(loader, [tmp_path])
+    entry = after.entry("atlanta_falcons")
+    assert loader.loaded == ["atlanta_falcons"]
+    assert entry.content_hash != old_entry.content_hash
+
+    #The .pdc is rebuilt for the new yaml and later loads read it
+    assert (tmp_path / "atlanta_falcons.pdc").read_bytes() != old_cache
+    assert line_plunge_10(after.load("atlanta_falcons")) == 9
+    assert line_plunge_10(Playsheet.from_entry(entry)) == 9
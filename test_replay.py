@@ -0,0 +1,58 @@
+import pytest
+
+from replay import ReplayLog
+from sim import simulate_game
+
+
+def test_unseeded_logs_are_kept(tmp_path):
+    #Each unseeded game gets its own log, marked as having no seed
+    for _ in range(2):
+        simulate_game("atlanta_falcons", "dallas_cowboys", log_dir=tmp_path)
+    simulate_game("atlanta_falcons", "dallas_cowboys", 7, log_dir=tmp_path)
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ["atlanta_falcons-dallas_cowboys-7.pdlog",
+                     "atlanta_falcons-dallas_cowboys-unseeded-0.pdlog",
+                     "atlanta_falcons-dallas_cowboys-unseeded-1.pdlog"]
+    with ReplayLog(tmp_path / names[1]) as log:
+        assert log.header.seed is None
+    with ReplayLog(tmp_path / names[0]) as log:
+        assert log.header.seed == 7
+
+
+def test_seek_matches_a_full_read(tmp_path):
+    result = simulate_game("atlanta_falcons", "dallas_cowboys", 3, log_dir=tmp_path)
+    with ReplayLog(tmp_path / "atlanta_falcons-dallas_cowboys-3.pdlog") as log:
+        snaps = list(log)
+        assert len(log) == len(snaps) == result.plays
+        for n in (0, 17, len(log) - 1):
+            assert log[n] == snaps[n]
+        assert log[-1] == snaps[-1]
+        with pytest.raises(IndexError):
+            log[len(log)]
+
+        final = snaps[-1].state
+        assert final.game_over
+        assert list(final.score) == [result.home_score, result.away_score]
+        assert log.game(17).state == snaps[17].state
+
+
+def test_same_seed_logs_the_same_game(tmp_path):
+    #Replaying a logged seed gives the log byte for byte
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    simulate_game("atlanta_falcons", "dallas_cowboys", 11, log_dir=first)
+    simulate_game("atlanta_falcons", "dallas_cowboys", 11, log_dir=second)
+    name = "atlanta_falcons-dallas_cowboys-11.pdlog"
+    assert (first / name).read_bytes() == (second / name).read_bytes()
+
+
+def test_partial_last_snap_is_ignored(tmp_path):
+    simulate_game("atlanta_falcons", "dallas_cowboys", 4, log_dir=tmp_path)
+    path = tmp_path / "atlanta_falcons-dallas_cowboys-4.pdlog"
+    with ReplayLog(path) as log:
+        snaps = list(log)
+    path.write_bytes(path.read_bytes()[:-5])
+    with ReplayLog(path) as log:
+        assert list(log) == snaps[:-1]
@@ -0,0 +1,14 @@
+import pytest
+
+from pd import Game, NullOutput, PlayCaller
+
+
+def test_snapshot_rows_are_read_only():
+    game = Game(output=NullOutput(), seed=0)
+    game.start_phase("atlanta_falcons", "dallas_cowboys", PlayCaller(), PlayCaller())
+    snapshot = game.snapshot()
+    with pytest.raises(TypeError):
+        snapshot.offense_plays[0]["expected_yards"] = 99
+    with pytest.raises(AttributeError):
+        snapshot.defense_plays.append({"name": "Blitz"})
+    assert game.snapshot().offense_plays == snapshot.offense_plays
@@ -0,0 +1,45 @@
+import pytest
+
+from pd import Game, NullOutput, RandomPlayCaller
+from state import GameState
+
+
+def play(game, snaps):
+    for _ in range(snaps):
+        game.pre_play_phase()
+        game.post_play_phase(game.evaluate_play_phase())
+
+
+def new_game(seed):
+    game = Game(output=NullOutput(), seed=seed)
+    game.start_phase("atlanta_falcons", "dallas_cowboys", RandomPlayCaller(), RandomPlayCaller())
+    return game
+
+
+def test_pack_round_trip():
+    game = new_game(3)
+    play(game, 40)
+    state = game.state
+    copy = GameState.unpack(state.pack())
+    assert copy == state
+    for name in GameState.__slots__:
+        assert getattr(copy, name) == getattr(state, name), name
+    assert len(state.pack()) == GameState.RECORD.size
+
+
+def test_set_state_restores_the_game():
+    #A game set to a packed state looks the same as the one it came from
+    game = new_game(5)
+    play(game, 25)
+    other = new_game(6)
+    other.set_state(GameState.unpack(game.state.pack()))
+    assert other.state == game.state
+    assert (other.down, other.distance, other.ball_position) == (game.down, game.distance, game.ball_position)
+    assert (other.user_team.score, other.comp_team.score) == (game.user_team.score, game.comp_team.score)
+
+
+def test_other_version_is_rejected():
+    data = bytearray(GameState().pack())
+    data[0] = GameState.VERSION + 1
+    with pytest.raises(ValueError):
+        GameState.unpack(bytes(data))
@@ -0,0 +1,23 @@
+import pytest
+
+from vector import VectorGames, differential_check
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vector_games_match_scalar_game(seed):
+    #Raises AssertionError naming the first game and snap whose state differs
+    assert differential_check("atlanta_falcons", "dallas_cowboys", n=16, seed=seed) > 0
+
+
+def test_mismatch_is_reported(monkeypatch):
+    #A VectorGames that forgets to run the clock must not pass
+    step = VectorGames.step
+
+    def step_without_clock(self, draws=None):
+        seconds = self.seconds.copy()
+        step(self, draws)
+        self.seconds[:] = seconds
+
+    monkeypatch.setattr(VectorGames, "step", step_without_clock)
+    with pytest.raises(AssertionError, match="game 0 snap 1"):
+        differential_check("atlanta_falcons", "dallas_cowboys", n=4, seed=0)
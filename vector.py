@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+import argparse
+
+import numpy as np
+
+from pd import (Game, Playsheet, PlayCaller, NullOutput, OFFENSE_PLAYS, DEFENSE_PLAYS,
+                CHART_PLAYS, PLAY_IDS, CHART_ROLLS, DEFENSE_ROLLS)
+from dice import OFFENSE_DICE, DEFENSE_DICE, SPECIAL_TEAMS_DICE
+
+
+class VectorGames:
+    """
+    N games between the same two teams held as numpy arrays and advanced
+    one snap at a time in lockstep
+
+    Plays are called the way RandomPlayCaller calls them, so the games
+    follow the same rules as a headless Game with two random callers.
+
+    Attributes:
+        ball_position, down, distance, quarter, seconds: Game state per game
+        possession: 0 when the home (user_team slot) team has the ball, 1 for away
+        direction:  +1 when play moves right, -1 when it moves left
+        state:      KICKOFF, SCRIMMAGE or POST_TOUCHDOWN
+        score:      (2, n) home and away scores
+        plays:      Snaps played per game
+        over:       True once a game has ended
+
+    Each snap consumes a row of DRAWS uniform numbers per game:
+        home decision, home call, away decision, away call, first roll, second roll
+    A call picks int(u * len(options)) from the options, a roll is looked
+    up in its dice model's cumulative distribution (DiceModel.index). Home
+    rolls first; a single roll (XP) uses the first.
+    """
+
+    KICKOFF = 0
+    SCRIMMAGE = 1
+    POST_TOUCHDOWN = 2
+
+    DRAWS = 6
+
+    def __init__(self, home, away, n, seed=None, sheets=None):
+        self.home = home
+        self.away = away
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+
+        self.offense_cumulative = np.array(OFFENSE_DICE.cumulative)
+        self.defense_cumulative = np.array(DEFENSE_DICE.cumulative)
+        self.special_teams_cumulative = np.array(SPECIAL_TEAMS_DICE.cumulative)
+
+        #(home, away) Playsheets can be given to play versions outside TEAMS
+        if sheets is None:
+            sheets = [Playsheet.load(home), Playsheet.load(away)]
+        self.chart = np.stack([
+            np.frombuffer(sheet.chart, dtype=np.int16).reshape(len(CHART_PLAYS), len(CHART_ROLLS))
+            for sheet in sheets]).astype(np.int32)
+        self.defense_chart = np.stack([
+            np.frombuffer(sheet.defense_chart, dtype=np.int16).reshape(len(DEFENSE_PLAYS), len(OFFENSE_PLAYS), len(DEFENSE_ROLLS))
+            for sheet in sheets]).astype(np.int32)
+
+        #Same starting state as Game.start_phase, home receives the opening kickoff
+        self.ball_position = np.full(n, -15, dtype=np.int32)
+        self.down = np.zeros(n, dtype=np.int32)
+        self.distance = np.zeros(n, dtype=np.int32)
+        self.quarter = np.ones(n, dtype=np.int32)
+        self.seconds = np.full(n, Game.QUARTER_SECONDS, dtype=np.int32)
+        self.possession = np.zeros(n, dtype=np.int32)
+        self.direction = np.ones(n, dtype=np.int32)
+        self.state = np.full(n, VectorGames.KICKOFF, dtype=np.int8)
+        self.score = np.zeros((2, n), dtype=np.int32)
+        self.plays = np.zeros(n, dtype=np.int32)
+        self.over = np.zeros(n, dtype=bool)
+
+    def active(self):
+        return ~self.over
+
+    def run(self):
+        while self.active().any():
+            self.step()
+        return self.score[0], self.score[1], self.plays
+
+    def step(self, draws=None):
+        """
+        Play one snap of every active game. draws is an (n, DRAWS) array of
+        uniform numbers, drawn from self.rng when not given
+        """
+        n = self.n
+        games = np.arange(n)
+        active = self.active()
+        if draws is None:
+            draws = self.rng.random((n, VectorGames.DRAWS))
+        home_decision, home_call, away_decision, away_call, first_roll, second_roll = draws.T
+
+        pos = self.possession
+        defense = 1 - pos
+        home_ball = pos == 0
+        offense_decision = np.where(home_ball, home_decision, away_decision)
+        offense_call = np.where(home_ball, home_call, away_call)
+        defense_call = np.where(home_ball, away_call, home_call)
+        offense_roll = np.where(home_ball, first_roll, second_roll)
+        defense_roll = np.where(home_ball, second_roll, first_roll)
+
+        kickoff = active & (self.state == VectorGames.KICKOFF)
+        scrimmage = active & (self.state == VectorGames.SCRIMMAGE)
+        post_td = active & (self.state == VectorGames.POST_TOUCHDOWN)
+        #POST_TD_PLAYS is ["2pt Attempt", "XP"]
+        xp = post_td & ((offense_decision * len(Game.POST_TD_PLAYS)).astype(np.int32) == 1)
+        two_point = post_td & ~xp
+
+        result = self.get_play_result(kickoff, scrimmage | two_point, xp, pos, defense,
+                                      offense_call, defense_call, offense_roll, defense_roll, first_roll)
+        result = np.where(active, result, 0)
+
+        self.update_ball_position(result)
+
+        #Kickoff, the receiving team takes over going the other way
+        self.seconds[kickoff] -= 10
+        self.direction[kickoff] *= -1
+        self.state[kickoff] = VectorGames.SCRIMMAGE
+        return_touchdown = self.receive_kick(kickoff)
+
+        #Scrimmage down
+        touchdown = scrimmage & self.check_for_touchdown()
+        safety = scrimmage & ~touchdown & self.check_for_safety()
+        first_down = scrimmage & ~touchdown & ~safety & self.check_for_firstdown(result)
+        turnover = scrimmage & ~touchdown & ~safety & ~first_down & self.check_for_turnover_on_downs()
+        next_down = scrimmage & ~touchdown & ~safety & ~first_down & ~turnover
+
+        self.seconds[touchdown] -= 10
+        self.score_touchdown(touchdown | return_touchdown)
+
+        #Defense scores 2 and the team that gave up the safety kicks off
+        self.seconds[safety] -= 10
+        self.possession[safety] = defense[safety]
+        self.score[defense[safety], games[safety]] += 2
+        self.setup_kickoff(safety)
+
+        self.down[first_down] = 1
+        self.set_distance(first_down)
+        self.seconds[first_down] -= 40
+
+        self.possession[turnover] = defense[turnover]
+        self.direction[turnover] *= -1
+        self.down[turnover] = 1
+        self.set_distance(turnover)
+        self.seconds[turnover] -= 10
+
+        self.down[next_down] += 1
+        self.distance[next_down] -= result[next_down]
+        self.seconds[next_down] -= 40
+
+        #XP or 2pt attempt, then the scoring team kicks off
+        self.score[pos[xp], games[xp]] += result[xp] >= 0
+        self.score[pos[two_point], games[two_point]] += 2 * (result[two_point] >= 2)
+        self.possession[post_td] = defense[post_td]
+        self.setup_kickoff(post_td)
+
+        self.plays[active] += 1
+        self.end_quarter(active)
+
+    def end_quarter(self, active):
+        """
+        Game.check_end_of_quarter for every active game
+        """
+        np.maximum(self.seconds, 0, out=self.seconds)
+        ended = active & (self.seconds == 0) & (self.state != VectorGames.POST_TOUCHDOWN)
+        over = ended & (self.quarter == Game.QUARTERS)
+        self.over |= over
+
+        next_quarter = ended & ~over
+        self.quarter[next_quarter] += 1
+        self.seconds[next_quarter] = Game.QUARTER_SECONDS
+        #Second half kickoff by the away team going right, otherwise teams change ends
+        halftime = next_quarter & (self.quarter == Game.QUARTERS // 2 + 1)
+        self.possession[halftime] = 1
+        self.direction[halftime] = 1
+        self.setup_kickoff(halftime)
+        change_ends = next_quarter & ~halftime
+        self.ball_position[change_ends] *= -1
+        self.direction[change_ends] *= -1
+
+    def receive_kick(self, mask):
+        """
+        Touchback or return touchdown after a kick, returns the games where
+        the kick was returned for a touchdown
+        """
+        touchback = mask & (self.direction * self.ball_position <= -50)
+        self.ball_position[touchback] = -25 * self.direction[touchback]
+        touchdown = mask & self.check_for_touchdown()
+        received = mask & ~touchdown
+        self.down[received] = 1
+        self.set_distance(received)
+        return touchdown
+
+    def score_touchdown(self, mask):
+        games = np.flatnonzero(mask)
+        self.score[self.possession[games], games] += 6
+        self.ball_position[mask] = np.where(self.direction[mask] < 0, -48, 48)
+        self.down[mask] = 0
+        self.distance[mask] = 0
+        self.state[mask] = VectorGames.POST_TOUCHDOWN
+
+    def setup_kickoff(self, mask):
+        self.ball_position[mask] = np.where(self.direction[mask] > 0, -15, 15)
+        self.down[mask] = 0
+        self.distance[mask] = 0
+        self.state[mask] = VectorGames.KICKOFF
+
+    @staticmethod
+    def roll_index(cumulative, u):
+        #Vectorized DiceModel.index
+        return np.minimum(np.searchsorted(cumulative, u, side="right"), len(cumulative) - 1)
+
+    def get_play_result(self, kickoff, scrimmage, xp, pos, defense,
+                        offense_call, defense_call, offense_roll, defense_roll, first_roll):
+        #Kickoff: net is the kicking team's kick less the receiving team's return
+        kick = self.chart[defense, PLAY_IDS["Kickoff"], self.roll_index(self.special_teams_cumulative, defense_roll)]
+        kick_return = self.chart[pos, PLAY_IDS["Kickoff Return"], self.roll_index(self.special_teams_cumulative, offense_roll)]
+
+        #Scrimmage and 2pt attempt: offense chart plus defense chart
+        play = (offense_call * len(OFFENSE_PLAYS)).astype(np.int32)
+        formation = (defense_call * len(DEFENSE_PLAYS)).astype(np.int32)
+        gained = self.chart[pos, play, self.roll_index(self.offense_cumulative, offense_roll)] + \
+                 self.defense_chart[defense, formation, play, self.roll_index(self.defense_cumulative, defense_roll)]
+
+        #XP = FG-30yds
+        xp_kick = self.chart[pos, PLAY_IDS["Field Goal"], self.roll_index(self.special_teams_cumulative, first_roll)] - 30
+
+        return np.select([kickoff, scrimmage, xp], [kick - kick_return, gained, xp_kick], 0)
+
+    def set_distance(self, mask):
+        ball = self.ball_position[mask]
+        direction = self.direction[mask]
+        first_and_goal = ((direction < 0) & (ball <= -40)) | ((direction > 0) & (ball >= 40))
+        self.distance[mask] = np.where(first_and_goal, 50 - np.abs(ball), 10)
+
+    def update_ball_position(self, result):
+        self.ball_position += self.direction * result
+
+    def check_for_touchdown(self):
+        return self.direction * self.ball_position >= 50
+
+    def check_for_safety(self):
+        return self.direction * self.ball_position <= -50
+
+    def check_for_firstdown(self, result):
+        return result >= self.distance
+
+    def check_for_turnover_on_downs(self):
+        return self.down == 4
+
+
+class ScriptedDice:
+    """
+    Stand-in for Game.dice that replays the rolls of one VectorGames snap
+    """
+
+    def __init__(self):
+        self.rolls = []
+
+    def offense_roll(self):
+        return OFFENSE_DICE.index(self.rolls.pop(0))
+
+    def defense_roll(self):
+        return DEFENSE_DICE.index(self.rolls.pop(0))
+
+    def special_teams_roll(self):
+        return SPECIAL_TEAMS_DICE.index(self.rolls.pop(0))
+
+
+class ScriptedPlayCaller(PlayCaller):
+    """
+    Calls plays from one VectorGames snap the way VectorGames does
+    """
+
+    def __init__(self):
+        self.decision = 0.0
+        self.call = 0.0
+
+    def select_play(self, game, team, plays):
+        u = self.decision if plays == Game.POST_TD_PLAYS else self.call
+        choices = [play for play in plays if play not in Game.SP_OFFENSE_PLAYS]
+        return choices[int(u * len(choices))]
+
+
+#State compared after every snap by differential_check
+CHECKED_STATE = "(ball_position, down, distance, quarter, seconds, possession, direction, home score, away score)"
+
+
+def differential_check(home, away, n=200, seed=0):
+    """
+    Play n games with VectorGames and replay the same draws through the
+    scalar Game, comparing the state of every game after every snap.
+    Returns the number of snaps compared, raises AssertionError on a mismatch
+    """
+
+    vector = VectorGames(home, away, n, seed)
+    games = []
+    for _ in range(n):
+        game = Game(output=NullOutput(), dice=ScriptedDice())
+        game.start_phase(home, away, ScriptedPlayCaller(), ScriptedPlayCaller())
+        games.append(game)
+
+    snaps = 0
+    while vector.active().any():
+        active = vector.active()
+        draws = vector.rng.random((n, VectorGames.DRAWS))
+        vector.step(draws)
+
+        for i in np.flatnonzero(active):
+            game = games[i]
+            game.user_team.play_caller.decision, game.user_team.play_caller.call, \
+                game.comp_team.play_caller.decision, game.comp_team.play_caller.call = draws[i, :4]
+            game.dice.rolls = list(draws[i, 4:])
+            game.pre_play_phase()
+            result = game.evaluate_play_phase()
+            game.post_play_phase(result)
+            snaps += 1
+
+            scalar = (game.ball_position, game.down, game.distance, game.quarter, game.seconds,
+                      0 if game.possession == game.user_team else 1,
+                      1 if game.direction == "right" else -1,
+                      game.user_team.score, game.comp_team.score)
+            vectorized = (vector.ball_position[i], vector.down[i], vector.distance[i], vector.quarter[i], vector.seconds[i],
+                          vector.possession[i], vector.direction[i], vector.score[0, i], vector.score[1, i])
+            vectorized = tuple(int(value) for value in vectorized)
+            if scalar != vectorized:
+                #Not an assert, so the check still runs under python -O
+                raise AssertionError(f"game {i} snap {vector.plays[i]}: {CHECKED_STATE} Game {scalar} "
+                                     f"!= VectorGames {vectorized}")
+
+    return snaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many Paydirt games at once with numpy")
+    parser.add_argument("home", help="Home team playsheet name, e.g. atlanta_falcons")
+    parser.add_argument("away", help="Away team playsheet name, e.g. dallas_cowboys")
+    parser.add_argument("-n", "--games", type=int, default=10000, help="Number of games to simulate")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed for the batch")
+    parser.add_argument("--check", action="store_true", help="Compare against the scalar Game instead")
+    args = parser.parse_args()
+
+    if args.check:
+        snaps = differential_check(args.home, args.away, args.games, args.seed)
+        print(f"{snaps} snaps match the scalar Game")
+        return
+
+    home_score, away_score, plays = VectorGames(args.home, args.away, args.games, args.seed).run()
+    print(f"{args.games} games, {plays.sum()} plays")
+    print(f"{args.home}: avg {home_score.mean():.2f}, won {(home_score > away_score).mean():.1%}")
+    print(f"{args.away}: avg {away_score.mean():.2f}, won {(away_score > home_score).mean():.1%}")
+
+if __name__ == "__main__":
+    main()
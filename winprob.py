@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import argparse
+import bisect
+import os
+
+import numpy as np
+
+from pd import Game, Playsheet
+from vector import VectorGames
+
+
+WINPROB_VERSION = 2
+#Next to this file like the playsheets, so it is the same from any working directory
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "winprob")
+
+#Grid the table is simulated on. The clock is the time left in the game,
+#interpolated only within a half: the first half's last knot is its final
+#snap, 10 seconds before halftime, so late first half lookups play through
+#the halftime kickoff instead of carrying the state into the third quarter.
+#yard is y -45..45 measured in the direction of the team with the ball (as in
+#solver.py) and distance is clamped to DISTANCES. Rows are the kickoff, each
+#down and the conversion after a touchdown; kickoff and conversion rows only
+#use their first distance and yard cell
+GAME_SECONDS = Game.QUARTERS * Game.QUARTER_SECONDS
+HALF_SECONDS = GAME_SECONDS // 2
+TIME_STEP = 300
+SECOND_HALF_TIMES = list(range(0, HALF_SECONDS + 1, TIME_STEP))
+FIRST_HALF_TIMES = [HALF_SECONDS + 10] + list(range(HALF_SECONDS + TIME_STEP, GAME_SECONDS + 1, TIME_STEP))
+TIMES = SECOND_HALF_TIMES + FIRST_HALF_TIMES
+YARD_STEP = 10
+YARDS = list(range(-45, 46, YARD_STEP))
+DISTANCES = [1, 5, 10, 20]
+KICKOFF_ROW = 0
+CONVERSION_ROW = 5
+ROWS = 6
+#Score margins, home less away, past this the margin is clamped
+MAX_MARGIN = 35
+
+#Play states looked up in the conversion row, the rest use their down
+CONVERSION_STATES = ("post_touchdown", "XP", "2pt Attempt")
+
+
+def interpolation(knots, value):
+    """
+    (low index, high index, weight of high) of value between sorted knots, clamped to the ends
+    """
+    if value <= knots[0]:
+        return 0, 0, 0.0
+    if value >= knots[-1]:
+        return len(knots) - 1, len(knots) - 1, 0.0
+    high = bisect.bisect_right(knots, value)
+    return high - 1, high, (value - knots[high - 1]) / (knots[high] - knots[high - 1])
+
+
+class WinTable:
+    """
+    Precomputed win probability of the home team (the user_team slot) for
+    one matchup, with random play calling on both sides
+
+    Lookups interpolate linearly in the clock, the yard line and the
+    distance, reading at most 8 cells whatever the state.
+
+    Attributes:
+        wp:     wp[possession, time, row, distance, yard, margin + MAX_MARGIN],
+                possession 0 when home has the ball. During a kickoff the
+                receiving team has the ball, as in Game
+    """
+
+    def __init__(self, wp):
+        self.wp = wp
+
+    def save(self, path):
+        #Probabilities in 1/65535 steps are plenty for a percentage
+        np.savez_compressed(path, wp=np.round(self.wp * 65535).astype(np.uint16))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["wp"].astype(np.float32) / 65535)
+
+    def home_win_probability(self, possession, seconds_left, row, distance, y, margin):
+        """
+        Win probability of home with margin home points less away points
+        """
+        margin = min(max(margin, -MAX_MARGIN), MAX_MARGIN) + MAX_MARGIN
+        if seconds_left > HALF_SECONDS:
+            t0, t1, ft = interpolation(FIRST_HALF_TIMES, seconds_left)
+            t0, t1 = t0 + len(SECOND_HALF_TIMES), t1 + len(SECOND_HALF_TIMES)
+        else:
+            t0, t1, ft = interpolation(SECOND_HALF_TIMES, seconds_left)
+        if row in (KICKOFF_ROW, CONVERSION_ROW):
+            d0 = d1 = y0 = y1 = 0
+            fd = fy = 0.0
+        else:
+            d0, d1, fd = interpolation(DISTANCES, distance)
+            y0, y1, fy = interpolation(YARDS, y)
+
+        table = self.wp[possession]
+        p = 0.0
+        for t, wt in ((t0, 1 - ft), (t1, ft)):
+            for d, wd in ((d0, 1 - fd), (d1, fd)):
+                for yard, wy in ((y0, 1 - fy), (y1, fy)):
+                    weight = wt * wd * wy
+                    if weight:
+                        p += weight * float(table[t, row, d, yard, margin])
+        return p
+
+    def win_probability(self, game):
+        """
+        Win probability of game.user_team, None before the game has started
+        """
+        if not game.play_state:
+            return None
+        margin = game.user_team.score - game.comp_team.score
+        if game.game_over:
+            return 1.0 if margin > 0 else 0.5 if margin == 0 else 0.0
+
+        if game.play_state == "kickoff":
+            row = KICKOFF_ROW
+        elif game.play_state in CONVERSION_STATES:
+            row = CONVERSION_ROW
+        else:
+            row = game.down
+        direction = 1 if game.direction == "right" else -1
+        possession = 0 if game.possession == game.user_team else 1
+        return self.home_win_probability(possession, game.seconds_left, row, game.distance,
+                                         game.ball_position * direction, margin)
+
+
+def grid_states():
+    """
+    (possession, seconds left, row, distance index, yard index) of every simulated cell
+    """
+    states = []
+    for possession in (0, 1):
+        for seconds_left in TIMES:
+            for row in range(ROWS):
+                if row in (KICKOFF_ROW, CONVERSION_ROW):
+                    states.append((possession, seconds_left, row, 0, 0))
+                    continue
+                for d in range(len(DISTANCES)):
+                    for yard in range(len(YARDS)):
+                        states.append((possession, seconds_left, row, d, yard))
+    return states
+
+
+def build(home, away, samples=128, seed=0):
+    """
+    Simulate samples rest-of-games from every grid cell with VectorGames
+    and turn their point margins into a WinTable. Cells with the same
+    clock run together so short games aren't stepped along with long ones
+    """
+    states = grid_states()
+    diffs = np.arange(-MAX_MARGIN, MAX_MARGIN + 1)
+    wp = np.zeros((2, len(TIMES), ROWS, len(DISTANCES), len(YARDS), len(diffs)), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+
+    for t, seconds_left in enumerate(TIMES):
+        cells = [state for state in states if state[1] == seconds_left]
+        possession, _, row, d, yard = (np.repeat(np.array(column), samples) for column in zip(*cells))
+        if seconds_left == 0:
+            margin = np.zeros((len(cells), samples), dtype=np.int32)
+        else:
+            vector = VectorGames(home, away, len(possession), rng.integers(2**63))
+            vector.possession[:] = possession
+            vector.direction[:] = 1
+            vector.quarter[:] = Game.QUARTERS - (seconds_left - 1) // Game.QUARTER_SECONDS
+            vector.seconds[:] = seconds_left - (Game.QUARTERS - vector.quarter) * Game.QUARTER_SECONDS
+
+            #Scrimmage downs, first and goal when the distance reaches past the goal line
+            y = np.array(YARDS)[yard]
+            vector.ball_position[:] = y
+            vector.down[:] = row
+            vector.distance[:] = np.minimum(np.array(DISTANCES)[d], 50 - y)
+            vector.state[:] = VectorGames.SCRIMMAGE
+
+            #Kickoffs from the kicking team's 35, the conversion from the 2
+            kickoff = row == KICKOFF_ROW
+            vector.setup_kickoff(kickoff)
+            conversion = row == CONVERSION_ROW
+            vector.ball_position[conversion] = 48
+            vector.down[conversion] = 0
+            vector.distance[conversion] = 0
+            vector.state[conversion] = VectorGames.POST_TOUCHDOWN
+
+            home_score, away_score, _ = vector.run()
+            margin = (home_score - away_score).reshape(len(cells), samples)
+
+        win = ((margin[:, :, None] + diffs) > 0).mean(1) + 0.5 * ((margin[:, :, None] + diffs) == 0).mean(1)
+        for (possession_i, _, row_i, d_i, yard_i), cell_wp in zip(cells, win):
+            if row_i in (KICKOFF_ROW, CONVERSION_ROW):
+                wp[possession_i, t, row_i] = cell_wp
+            else:
+                wp[possession_i, t, row_i, d_i, yard_i] = cell_wp
+    return WinTable(wp)
+
+
+def table_path(home_sheet, away_sheet, samples):
+    return os.path.join(TABLE_DIR, f"{home_sheet.content_hash[:16]}-{away_sheet.content_hash[:16]}"
+                                   f"-{samples}-v{WINPROB_VERSION}.npz")
+
+_tables = {}
+
+def matchup_table(home, away, samples=128):
+    """
+    WinTable for home vs away, built once and persisted in TABLE_DIR
+    """
+    home_sheet = Playsheet.load(home)
+    away_sheet = Playsheet.load(away)
+    path = table_path(home_sheet, away_sheet, samples)
+
+    table = _tables.get(path)
+    if table is None:
+        if os.path.exists(path):
+            table = WinTable.load(path)
+        else:
+            table = build(home, away, samples)
+            os.makedirs(TABLE_DIR, exist_ok=True)
+            table.save(path)
+        _tables[path] = table
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the win probability table of a matchup")
+    parser.add_argument("home", help="Home team playsheet name, e.g. atlanta_falcons")
+    parser.add_argument("away", help="Away team playsheet name, e.g. dallas_cowboys")
+    parser.add_argument("-n", "--samples", type=int, default=128, help="Simulated games per grid cell")
+    args = parser.parse_args()
+
+    table = matchup_table(args.home, args.away, args.samples)
+    opening = table.home_win_probability(0, GAME_SECONDS, KICKOFF_ROW, 0, 0, 0)
+    print(f"{args.home} receiving the opening kickoff: {opening:.1%}")
+    for seconds_left, margin in ((GAME_SECONDS // 2, 7), (300, 3), (60, -4)):
+        p = table.home_win_probability(0, seconds_left, 1, 10, -25, margin)
+        print(f"{args.home} 1st and 10 at own 25, {margin:+d} with {seconds_left // 60}:{seconds_left % 60:02d} left: {p:.1%}")
+
+if __name__ == "__main__":
+    main()